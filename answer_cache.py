@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from question_index import normalize_question
+
+
+def hash_upload(fileobj, chunk_size=1024 * 1024):
+    """BLAKE2b digest of an uploaded file, read in chunks and rewound after."""
+    digest = hashlib.blake2b(digest_size=20)
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """
+    Answers keyed by (normalized question, uploaded file digest).
+
+    Identical uploads of the same assignment file get the stored answer
+    without rerunning the handler. Entries live in an in-memory LRU bounded
+    by both count and total size; if ``persist_dir`` is given they are also
+    written there, one small JSON file per entry, so they survive restarts
+    and are shared by every worker pointing at the same directory.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024, persist_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_dir = persist_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(question, digest):
+        return normalize_question(question) + "\0" + digest
+
+    def _path(self, key):
+        name = hashlib.blake2b(key.encode("utf-8"), digest_size=20).hexdigest()
+        return os.path.join(self.persist_dir, name + ".json")
+
+    def get(self, question, digest):
+        """Return the cached answer, or None on a miss."""
+        key = self.make_key(question, digest)
+        with self._lock:
+            answer = self._entries.get(key)
+            if answer is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return answer
+
+        if self.persist_dir:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                if entry["key"] == key:
+                    self._remember(key, entry["answer"])
+                    with self._lock:
+                        self.hits += 1
+                    return entry["answer"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, question, digest, answer):
+        """Store an answer for a question and upload digest."""
+        key = self.make_key(question, digest)
+        self._remember(key, answer)
+        if self.persist_dir:
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"key": key, "answer": answer}, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Error persisting cached answer: {e}")
+
+    def _remember(self, key, answer):
+        size = len(key) + len(answer)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(key) + len(previous)
+            self._entries[key] = answer
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                old_key, old_answer = self._entries.popitem(last=False)
+                self._size -= len(old_key) + len(old_answer)
+
+    def __len__(self):
+        return len(self._entries)
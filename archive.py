@@ -0,0 +1,103 @@
+"""
+Reading many data files out of one uploaded zip.
+
+``select_members`` walks the archive's central directory (no member is
+decompressed) and keeps the CSV, TSV/TXT and JSON files a question is about;
+``open_member`` decodes one with its encoding, taken from a hint in the
+question ("data1.csv (CP-1252)") or detected from a byte-order mark, falling
+back from UTF-8 to CP-1252; ``map_members`` runs a function over the
+selected members in a thread pool and returns the results in archive order.
+Threads suit this work: zlib and the pandas parser release the GIL, and
+every thread reads from the same spooled upload without copying it.
+"""
+import codecs
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+FORMATS = {".csv": "csv", ".tsv": "csv", ".txt": "csv", ".json": "json", ".jsonl": "json", ".ndjson": "json"}
+
+ENCODING_HINT_RE = re.compile(
+    r"([\w.-]+\.\w+)\W{1,3}(?:encoded (?:in|as|with)\s+)?"
+    r"(utf-?8|utf-?16(?:-?[lb]e)?|utf-?32|cp-?\d+|windows-\d+|latin-?1|iso-8859-\d+)",
+    re.IGNORECASE,
+)
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def _codec(name):
+    for candidate in (name, name.replace("-", "")):
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            pass
+    return None
+
+
+def parse_encoding_hints(question):
+    """``{file name: codec}`` for every file whose encoding the question states."""
+    hints = {}
+    for name, encoding in ENCODING_HINT_RE.findall(question):
+        codec = _codec(encoding)
+        if codec:
+            hints[name.lower()] = codec
+    return hints
+
+
+def member_format(info):
+    return FORMATS.get(os.path.splitext(info.filename)[1].lower())
+
+
+def select_members(zip_ref, question="", formats=FORMATS):
+    """
+    Data members of ``zip_ref`` in archive order.
+
+    If the question names any of them, only those are kept; otherwise every
+    member with a supported extension is.
+    """
+    members = [
+        info for info in zip_ref.infolist()
+        if not info.is_dir() and os.path.splitext(info.filename)[1].lower() in formats
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+    lowered = question.lower()
+    named = [info for info in members if os.path.basename(info.filename).lower() in lowered]
+    return named or members
+
+
+def detect_encoding(head):
+    """Best guess at the encoding of a file from its first bytes."""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # The head may end part-way through a character, which is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def open_member(zip_ref, info, hints=None, sniff_bytes=64 * 1024):
+    """Text stream over one member, decoded with its hinted or detected encoding."""
+    encoding = (hints or {}).get(os.path.basename(info.filename).lower())
+    if encoding is None:
+        with zip_ref.open(info) as member:
+            encoding = detect_encoding(member.read(sniff_bytes))
+    elif encoding == "utf-8":
+        encoding = "utf-8-sig"
+    return io.TextIOWrapper(zip_ref.open(info), encoding=encoding, newline="")
+
+
+def map_members(zip_ref, members, func, workers=None):
+    """``[func(zip_ref, info) for info in members]``, computed in a thread pool."""
+    if len(members) <= 1:
+        return [func(zip_ref, info) for info in members]
+    workers = min(len(members), workers or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda info: func(zip_ref, info), members))
@@ -0,0 +1,244 @@
+"""
+Load and latency benchmark for the question API.
+
+Drives the app either in-process through httpx's ASGI transport or over HTTP
+against a local uvicorn server, runs each scenario with a fixed number of
+requests at a fixed concurrency, and reports p50/p95/p99 latency, throughput
+and resident memory. Results can be saved as JSON and compared against an
+earlier run::
+
+    python benchmark.py --mode asgi --output bench.json
+    python benchmark.py --mode uvicorn --compare bench.json
+
+The benchmark works on a scratch copy of the answer store, so feedback
+writes never touch model_data.json. Requires httpx.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+KNOWN_QUESTION = "What is the capital of France?"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def rss_mb(pid=None):
+    """Current resident set size of a process in MiB (Linux), else peak RSS of this one."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_zip(size_bytes, requests, prefix):
+    """A zip holding one CSV of roughly ``size_bytes`` with a column per request."""
+    columns = ["answer"] + [f"{prefix}{i}" for i in range(requests)]
+    row = ",".join(str(i) for i in range(len(columns))) + "\n"
+    rows = max(1, size_bytes // len(row))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("extract.csv", ",".join(columns) + "\n" + row * rows)
+    return buf.getvalue()
+
+
+def build_scenarios(requests, zip_sizes):
+    """
+    Map scenario name to a function ``i -> request kwargs``.
+
+    Requests that should exercise a handler use a distinct question each time
+    (a different snippet or column), so they are not served from the stored
+    answers that earlier requests in the run have already saved.
+    """
+    scenarios = {
+        "known_question": lambda i: {"url": "/api/", "data": {"question": KNOWN_QUESTION}},
+        "python_code": lambda i: {"url": "/api/", "data": {
+            "question": f"What is the output of the following Python code?\n```python\nprint(sum(range({i})))\n```"}},
+        "feedback": lambda i: {"url": "/api/feedback", "json": {
+            "question": f"Benchmark feedback question {i}?", "correct_answer": str(i)}},
+    }
+    for size in zip_sizes:
+        # Column names are unique per size too, so no scenario reuses another's answers
+        prefix = f"k{size // 1024}_"
+        payload = make_zip(size, requests, prefix)
+
+        def zip_request(i, payload=payload, prefix=prefix):
+            question = ("Download and unzip file bench.zip which has a single extract.csv file inside. "
+                        f'What is the value in the "{prefix}{i}" column of the CSV file?')
+            return {"url": "/api/", "data": {"question": question},
+                    "files": {"file": ("bench.zip", payload, "application/zip")}}
+
+        scenarios[f"zip_csv_{size // 1024}kb"] = zip_request
+    return scenarios
+
+
+async def run_scenario(client, make_request, requests, concurrency):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        kwargs = make_request(i)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(kwargs.pop("url"), **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "throughput_rps": requests / elapsed,
+    }
+
+
+async def run_all(client, scenarios, requests, concurrency, measure_rss):
+    results = {}
+    for name, make_request in scenarios.items():
+        # One untimed request so lazy imports and worker startup are not measured
+        warmup = make_request(requests)
+        await client.post(warmup.pop("url"), **warmup)
+        results[name] = await run_scenario(client, make_request, requests, concurrency)
+        results[name]["rss_mb"] = measure_rss()
+        print(f"{name:>20}: p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+              f"p99 {results[name]['p99_ms']:8.2f} ms  {results[name]['throughput_rps']:8.1f} req/s  "
+              f"errors {results[name]['errors']}")
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def bench_asgi(scenarios, args):
+    import httpx
+    from core import create_app
+
+    transport = httpx.ASGITransport(app=create_app(prefix="/api"))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        return await run_all(client, scenarios, args.requests, args.concurrency, rss_mb)
+
+
+async def bench_uvicorn(scenarios, args):
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=os.environ.copy(), stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            return await run_all(client, scenarios, args.requests, args.concurrency, lambda: rss_mb(server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    print(f"\nChange versus {baseline_path} (negative latency is better):")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if previous[metric]:
+                deltas.append(f"{metric} {100 * (current[metric] - previous[metric]) / previous[metric]:+6.1f}%")
+        print(f"{name:>20}: " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Buddhimatta question API.")
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--zip-sizes", default="16,1024,8192", help="CSV sizes in KiB, comma-separated")
+    parser.add_argument("--scenarios", help="only run scenarios whose name contains one of these, comma-separated")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a previous JSON results file")
+    args = parser.parse_args()
+
+    # Scratch copy of the store, set up before core is imported
+    scratch = tempfile.mkdtemp(prefix="buddhimatta-bench-")
+    data_file = os.path.join(scratch, "model_data.json")
+    shutil.copy(os.path.join(BASE_DIR, "model_data.json"), data_file)
+    os.environ["BUDDHIMATTA_DATA_FILE"] = data_file
+    sys.path.insert(0, BASE_DIR)
+
+    zip_sizes = [int(size) * 1024 for size in args.zip_sizes.split(",") if size]
+    scenarios = build_scenarios(args.requests + 1, zip_sizes)
+    if args.scenarios:
+        wanted = args.scenarios.split(",")
+        scenarios = {name: fn for name, fn in scenarios.items() if any(w in name for w in wanted)}
+
+    try:
+        runner = bench_asgi if args.mode == "asgi" else bench_uvicorn
+        results = asyncio.run(runner(scenarios, args))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "mode": args.mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Request body size limit, enforced while the body streams in.
+
+A request that declares a ``Content-Length`` over the limit is answered
+with 413 before any of its body is read. One sent without a length (chunked)
+is counted as it arrives and stopped with 413 as soon as it passes the
+limit, so an oversized upload never reaches the multipart parser's spool
+file in full.
+"""
+import json
+
+from fastapi import HTTPException
+
+
+def too_large_detail(max_bytes):
+    return f"Request body is larger than the {max_bytes} byte limit"
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware rejecting request bodies over ``max_bytes`` (0 disables it)."""
+
+    def __init__(self, app, max_bytes):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the app's body parsing, so FastAPI turns it
+                    # into the 413 response
+                    raise HTTPException(status_code=413, detail=too_large_detail(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": too_large_detail(self.max_bytes)}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,109 @@
+"""
+Offline bulk training from JSONL, CSV or JSON files.
+
+    python bulk_train.py pairs.jsonl more.csv --data-file model_data.json
+
+JSONL (``.jsonl``/``.ndjson``) lines and JSON lists hold objects with
+``question`` and ``answer`` (or ``q`` and ``a``) fields; a JSON object maps
+questions to answers; CSV files need ``question`` and ``answer`` columns.
+JSONL and CSV files are streamed, so their size is not limited by memory.
+Pairs are deduplicated and applied in batches, the match indexes are built
+once at the end, and one snapshot is written atomically (plus the binary
+snapshot if the model uses one). Stop the API server first, or point this at
+the shared database it uses, so the two don't overwrite each other's files.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+
+class SourceReader:
+    """Pairs from a list of files, tracking bytes read for progress reports."""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.total_bytes = sum(os.path.getsize(path) for path in paths)
+        self._done_bytes = 0
+        self._current = None
+
+    @property
+    def bytes_read(self):
+        current = self._current.tell() if self._current is not None and not self._current.closed else 0
+        return self._done_bytes + current
+
+    def __iter__(self):
+        for path in self.paths:
+            with open(path, "rb") as raw:
+                self._current = raw
+                yield from self._read(path, raw)
+            self._done_bytes += os.path.getsize(path)
+            self._current = None
+
+    def _read(self, path, raw):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(raw, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield _pair(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Skipping {path}:{line_number}: {e}")
+        elif extension == ".csv":
+            text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+            for row in csv.DictReader(text):
+                yield row.get("question"), row.get("answer")
+            text.detach()
+        elif extension == ".json":
+            data = json.load(raw)
+            if isinstance(data, dict):
+                yield from data.items()
+            else:
+                for item in data:
+                    yield _pair(item)
+        else:
+            raise ValueError(f"Unsupported training file type: {path}")
+
+
+def _pair(item):
+    if "question" in item:
+        return item["question"], item.get("answer")
+    return item["q"], item.get("a")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load question-answer pairs into the model.")
+    parser.add_argument("sources", nargs="+", help="JSONL, CSV or JSON files of question-answer pairs")
+    parser.add_argument("--data-file", default=os.environ.get("BUDDHIMATTA_DATA_FILE", "model_data.json"))
+    parser.add_argument("--shared-db", default=os.environ.get("BUDDHIMATTA_SHARED_DB"))
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    from train_model import BuddhimattaModel
+
+    model = BuddhimattaModel(args.data_file, shared_db=args.shared_db)
+    reader = SourceReader(args.sources)
+    start = time.perf_counter()
+
+    def report(stats):
+        elapsed = time.perf_counter() - start
+        percent = 100 * reader.bytes_read / reader.total_bytes if reader.total_bytes else 100
+        print(f"{percent:5.1f}%  {stats['read']} rows read, {stats['added']} added, {stats['updated']} updated, "
+              f"{stats['skipped']} skipped  ({stats['read'] / elapsed if elapsed else 0:.0f} rows/s)")
+
+    try:
+        stats = model.train_bulk(reader, batch_size=args.batch_size, progress=report)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Training complete in {time.perf_counter() - start:.1f}s: {stats['added']} added, "
+          f"{stats['updated']} updated, {stats['skipped']} skipped. "
+          f"Model now has {len(model.qa_pairs)} question-answer pairs.")
+
+
+if __name__ == "__main__":
+    main()
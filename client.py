@@ -0,0 +1,262 @@
+"""
+Client library for the Buddhimatta API.
+
+``BuddhimattaClient`` is synchronous and built on a pooled ``requests``
+session; ``AsyncBuddhimattaClient`` is built on ``httpx`` (optional, only
+needed for the async client). Both keep connections alive across calls,
+retry transient failures with exponential backoff, stream file uploads
+from disk, and answer many questions at once through ``ask_many``, which
+sends them to ``/batch`` in chunks.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://buddhimatta.vercel.app/api"
+
+# Statuses worth retrying: rate limiting and a gateway or instance restarting
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class ClientError(Exception):
+    """Raised when the API cannot be reached or returns an error status."""
+
+
+def _normalize_item(item):
+    """Accept a question string, a (question, file_path) pair or a dict."""
+    if isinstance(item, str):
+        return {"question": item, "file_path": None}
+    if isinstance(item, (tuple, list)):
+        question, file_path = item
+        return {"question": question, "file_path": file_path}
+    return {"question": item["question"], "file_path": item.get("file_path")}
+
+
+def _batch_payload(items):
+    """The ``questions`` list for /batch, naming each upload by a unique field."""
+    questions, uploads = [], {}
+    for i, item in enumerate(items):
+        entry = {"question": item["question"]}
+        if item["file_path"]:
+            field = f"file{i}"
+            entry["file"] = field
+            uploads[field] = item["file_path"]
+        questions.append(entry)
+    return questions, uploads
+
+
+def _multipart_chunks(fields, uploads, boundary, chunk_size=64 * 1024):
+    """Yield a multipart/form-data body, reading uploads from disk in chunks."""
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode("utf-8")
+    for name, file_path in uploads.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{os.path.basename(file_path)}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("utf-8")
+
+
+def _parse_batch(text, offset):
+    results = []
+    for line in text.splitlines():
+        if line.strip():
+            result = json.loads(line)
+            result["index"] += offset
+            results.append(result)
+    return results
+
+
+class BuddhimattaClient:
+    """
+    Synchronous client with a keep-alive connection pool and retries.
+
+    Use it as a context manager, or call ``close()`` when done, so pooled
+    connections are released.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=60.0, retries=3, backoff=0.5,
+                 concurrency=8, batch_size=100):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _post(self, path, make_request):
+        """POST with retries; ``make_request`` returns fresh kwargs per attempt."""
+        url = self.base_url + path
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(url, timeout=self.timeout, **make_request())
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise ClientError(f"Error: {str(e)}")
+            except requests.RequestException as e:
+                raise ClientError(f"Error: {str(e)}")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    if response.status_code != 200:
+                        raise ClientError(f"Error: {response.status_code} - {response.text}")
+                    return response
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def _multipart(self, fields, uploads):
+        boundary = uuid.uuid4().hex
+        return {
+            "data": _multipart_chunks(fields, uploads, boundary),
+            "headers": {"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        }
+
+    def ask(self, question, file_path=None):
+        """Ask one question, optionally uploading a file, and return the answer."""
+        uploads = {"file": file_path} if file_path else {}
+        response = self._post("/", lambda: self._multipart({"question": question}, uploads))
+        return response.json()["answer"]
+
+    def feedback(self, question, correct_answer):
+        """Send the correct answer for a question and return the server's message."""
+        payload = {"question": question, "correct_answer": correct_answer}
+        response = self._post("/feedback", lambda: {"json": payload})
+        return response.json()["message"]
+
+    def _ask_chunk(self, items, offset):
+        questions, uploads = _batch_payload(items)
+        if uploads:
+            response = self._post("/batch", lambda: self._multipart({"questions": json.dumps(questions)}, uploads))
+        else:
+            response = self._post("/batch", lambda: {"json": questions})
+        return _parse_batch(response.text, offset)
+
+    def ask_many(self, items):
+        """
+        Answer many questions, ``batch_size`` per request, ``concurrency``
+        requests at a time.
+
+        Items are question strings, ``(question, file_path)`` pairs or dicts
+        with ``question`` and ``file_path``. Returns one
+        ``{"index", "answer"}`` (or ``{"index", "error"}``) dict per item, in
+        order.
+        """
+        items = [_normalize_item(item) for item in items]
+        chunks = [(items[i:i + self.batch_size], i) for i in range(0, len(items), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = pool.map(lambda chunk: self._ask_chunk(*chunk), chunks)
+            return [result for chunk_results in results for result in chunk_results]
+
+
+class AsyncBuddhimattaClient:
+    """
+    Asyncio client with a pooled ``httpx.AsyncClient``.
+
+    Requires ``httpx``. Use it with ``async with`` or call ``aclose()``.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=60.0, retries=3, backoff=0.5,
+                 concurrency=8, batch_size=100):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("AsyncBuddhimattaClient requires httpx: pip install httpx")
+        self._httpx = httpx
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _post(self, path, data=None, uploads=None, json_body=None):
+        url = self.base_url + path
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                opened = []
+                try:
+                    # httpx reads file objects in chunks while sending
+                    files = None
+                    if uploads:
+                        files = {}
+                        for field, file_path in uploads.items():
+                            f = open(file_path, "rb")
+                            opened.append(f)
+                            files[field] = (os.path.basename(file_path), f)
+                    response = await self.client.post(url, data=data, files=files, json=json_body)
+                except self._httpx.TransportError as e:
+                    if attempt == self.retries:
+                        raise ClientError(f"Error: {str(e)}")
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        if response.status_code != 200:
+                            raise ClientError(f"Error: {response.status_code} - {response.text}")
+                        return response
+                finally:
+                    for f in opened:
+                        f.close()
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def ask(self, question, file_path=None):
+        """Ask one question, optionally uploading a file, and return the answer."""
+        uploads = {"file": file_path} if file_path else None
+        response = await self._post("/", data={"question": question}, uploads=uploads)
+        return response.json()["answer"]
+
+    async def feedback(self, question, correct_answer):
+        """Send the correct answer for a question and return the server's message."""
+        response = await self._post("/feedback", json_body={"question": question, "correct_answer": correct_answer})
+        return response.json()["message"]
+
+    async def _ask_chunk(self, items, offset):
+        questions, uploads = _batch_payload(items)
+        if uploads:
+            response = await self._post("/batch", data={"questions": json.dumps(questions)}, uploads=uploads)
+        else:
+            response = await self._post("/batch", json_body=questions)
+        return _parse_batch(response.text, offset)
+
+    async def ask_many(self, items):
+        """Async counterpart of ``BuddhimattaClient.ask_many``."""
+        items = [_normalize_item(item) for item in items]
+        chunks = [self._ask_chunk(items[i:i + self.batch_size], i) for i in range(0, len(items), self.batch_size)]
+        results = await asyncio.gather(*chunks)
+        return [result for chunk_results in results for result in chunk_results]
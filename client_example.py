@@ -1,9 +1,13 @@
-import requests
-import sys
 import os
+import sys
+
+from client import BuddhimattaClient, ClientError
 
 # Replace with your deployed API URL
-API_URL = "https://buddhimatta.vercel.app/api/"  # No trailing slash for Vercel deployment
+API_URL = "https://buddhimatta.vercel.app/api"
+
+# One pooled, keep-alive session shared by every call below
+client = BuddhimattaClient(API_URL)
 
 def ask_question(question, file_path=None):
     """
@@ -16,28 +20,13 @@ def ask_question(question, file_path=None):
     Returns:
         str: The answer from the API
     """
-    files = {}
-    if file_path and os.path.exists(file_path):
-        files = {"file": (os.path.basename(file_path), open(file_path, "rb"))}
+    if file_path and not os.path.exists(file_path):
+        file_path = None
 
     try:
-        response = requests.post(
-            API_URL,
-            data={"question": question},
-            files=files
-        )
-
-        if response.status_code == 200:
-            return response.json()["answer"]
-        else:
-            return f"Error: {response.status_code} - {response.text}"
-    except Exception as e:
-        return f"Error: {str(e)}"
-    finally:
-        # Close any open file handles
-        for file_obj in files.values():
-            if hasattr(file_obj[1], 'close'):
-                file_obj[1].close()
+        return client.ask(question, file_path)
+    except ClientError as e:
+        return str(e)
 
 def provide_feedback(question, correct_answer):
     """
@@ -51,17 +40,9 @@ def provide_feedback(question, correct_answer):
         str: The response message from the API
     """
     try:
-        response = requests.post(
-            API_URL + "/feedback",  # Note the slash for Vercel deployment
-            json={"question": question, "correct_answer": correct_answer}
-        )
-
-        if response.status_code == 200:
-            return response.json()["message"]
-        else:
-            return f"Error: {response.status_code} - {response.text}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+        return client.feedback(question, correct_answer)
+    except ClientError as e:
+        return str(e)
 
 if __name__ == "__main__":
     print("Buddhimatta - Assignment Answer Client")
@@ -0,0 +1,160 @@
+"""
+Compact in-memory ``{question: answer}`` mapping.
+
+A plain dict keeps every answer as its own Python string, about 50 bytes of
+object header on top of the text, and stores one copy per question even
+when thousands of questions share an answer. ``CompactPairs`` keeps each
+distinct answer once, UTF-8 encoded in a single arena ``bytearray``, and
+maps each question to an answer id whose offset and length live in flat
+arrays. Answers of ``compress_min_bytes`` or more can be stored compressed
+with zlib or, if the ``zstandard`` package is installed, zstd; only the
+``hot_entries`` most recently read answers are kept decoded.
+
+Questions stay ordinary ``str`` keys. The match indexes hold every stored
+question as a string anyway, so packing them here would add a copy rather
+than remove one, and boilerplate shared between questions is not
+deduplicated.
+"""
+import functools
+import hashlib
+import zlib
+from array import array
+from collections.abc import MutableMapping
+
+
+class _Arena:
+    """Answer bytes and per-answer-id offset, length and flags."""
+
+    __slots__ = ("data", "offsets", "lengths", "compressed")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.compressed = bytearray()
+
+
+def _codec(compression):
+    if compression is None:
+        return None, None
+    if compression == "zlib":
+        return functools.partial(zlib.compress, level=6), zlib.decompress
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires the zstandard package: pip install zstandard")
+        return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"Unknown compression {compression!r}; use 'zlib' or 'zstd'")
+
+
+class CompactPairs(MutableMapping):
+    """
+    ``{question: answer}`` with deduplicated answers packed in one arena.
+
+    Writes must be serialized by the caller (the model holds its lock);
+    reads may run concurrently with them. Replaced answers leave unused
+    bytes behind, reclaimed by ``compact`` once they make up half the arena.
+    """
+
+    def __init__(self, pairs=(), compression=None, compress_min_bytes=512, hot_entries=1024):
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self._compress, self._decompress = _codec(compression)
+        self._questions = {}
+        self._arena = _Arena()
+        self._digests = []
+        self._by_digest = {}
+        self._refs = array("I")
+        self._unused_bytes = 0
+        # Answer ids never change meaning, so decoded answers can be cached by id
+        self._decode = functools.lru_cache(maxsize=hot_entries)(self._decode_uncached)
+        for question, answer in pairs.items() if isinstance(pairs, dict) else pairs:
+            self[question] = answer
+
+    def _decode_uncached(self, answer_id):
+        arena = self._arena
+        start = arena.offsets[answer_id]
+        raw = bytes(arena.data[start:start + arena.lengths[answer_id]])
+        if arena.compressed[answer_id]:
+            raw = self._decompress(raw)
+        return raw.decode("utf-8")
+
+    def __getitem__(self, question):
+        return self._decode(self._questions[question])
+
+    def _store(self, answer):
+        encoded = answer.encode("utf-8")
+        digest = hashlib.blake2b(encoded, digest_size=16).digest()
+        answer_id = self._by_digest.get(digest)
+        if answer_id is not None:
+            self._refs[answer_id] += 1
+            return answer_id
+        compressed = False
+        if self._compress is not None and len(encoded) >= self.compress_min_bytes:
+            packed = self._compress(encoded)
+            if len(packed) < len(encoded):
+                encoded, compressed = packed, True
+        arena = self._arena
+        answer_id = len(arena.offsets)
+        arena.offsets.append(len(arena.data))
+        arena.lengths.append(len(encoded))
+        arena.compressed.append(compressed)
+        arena.data += encoded
+        self._digests.append(digest)
+        self._refs.append(1)
+        self._by_digest[digest] = answer_id
+        return answer_id
+
+    def _release(self, answer_id):
+        self._refs[answer_id] -= 1
+        if self._refs[answer_id] == 0:
+            del self._by_digest[self._digests[answer_id]]
+            self._unused_bytes += self._arena.lengths[answer_id]
+
+    def __setitem__(self, question, answer):
+        answer_id = self._store(answer)
+        previous = self._questions.get(question)
+        self._questions[question] = answer_id
+        if previous is not None:
+            self._release(previous)
+        if self._unused_bytes > 1024 * 1024 and self._unused_bytes * 2 > len(self._arena.data):
+            self.compact()
+
+    def __delitem__(self, question):
+        self._release(self._questions.pop(question))
+
+    def __iter__(self):
+        return iter(self._questions)
+
+    def __len__(self):
+        return len(self._questions)
+
+    def __contains__(self, question):
+        return question in self._questions
+
+    def compact(self):
+        """Rewrite the arena without the bytes of answers no question uses."""
+        old = self._arena
+        fresh = _Arena()
+        for answer_id in range(len(old.offsets)):
+            start = old.offsets[answer_id]
+            length = old.lengths[answer_id] if self._refs[answer_id] else 0
+            fresh.offsets.append(len(fresh.data))
+            fresh.lengths.append(length)
+            fresh.compressed.append(old.compressed[answer_id] if length else 0)
+            fresh.data += old.data[start:start + length]
+        # One assignment, so a concurrent read sees either arena whole
+        self._arena = fresh
+        self._unused_bytes = 0
+
+    def stats(self):
+        """Sizes for judging how much the packing saves."""
+        arena = self._arena
+        return {
+            "questions": len(self._questions),
+            "distinct_answers": len(self._by_digest),
+            "arena_bytes": len(arena.data),
+            "unused_bytes": self._unused_bytes,
+            "compressed_answers": sum(arena.compressed),
+        }
@@ -0,0 +1,384 @@
+"""
+Request pipeline shared by every entry point.
+
+main.py (uvicorn), vercel_main.py (Vercel) and api/index.py (Vercel
+function under /api) all build their app with ``create_app`` and differ only
+in the URL prefix they mount it under.
+
+Importing this module stays cheap: the answer model is loaded by the first
+request that needs it, or ahead of time by ``warm_up`` (run at startup on
+long-lived servers). Set ``BUDDHIMATTA_PROFILE_STARTUP=1`` to print how long
+loading the model and building its index take; ``startup_profile.py``
+reports per-module import costs.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Optional
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from answer_cache import AnswerCache, hash_upload
+from body_limit import BodySizeLimitMiddleware
+import executors
+from executors import cancel_on_disconnect, run_blocking
+from handlers import FILE_CONTENT_RE, iter_text, registry, get_snippet_pool
+import metrics
+from metrics import LOOKUPS, stage
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+UNKNOWN_ANSWER = "I don't have the answer to this question yet. Please provide feedback with the correct answer to improve the system."
+
+PROFILE_STARTUP = os.environ.get("BUDDHIMATTA_PROFILE_STARTUP", "0") != "0"
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """The answer model, loaded on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+                from train_model import BuddhimattaModel
+                _model = BuddhimattaModel(
+                    os.environ.get("BUDDHIMATTA_DATA_FILE", os.path.join(BASE_DIR, "model_data.json")),
+                    shared_db=os.environ.get("BUDDHIMATTA_SHARED_DB"),
+                    compact_store=os.environ.get("BUDDHIMATTA_COMPACT_STORE"),
+                )
+                if PROFILE_STARTUP:
+                    print(f"Startup profile: loaded the model in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return _model
+
+
+def warm_up():
+    """Load the model and build its question index and template store before the first request."""
+    model = get_model()
+    start = time.perf_counter()
+    # Both are built lazily by their properties, under the model's lock
+    model.index
+    index_done = time.perf_counter()
+    model.templates
+    if PROFILE_STARTUP:
+        print(f"Startup profile: built the question index in {(index_done - start) * 1000:.1f} ms")
+        print(f"Startup profile: built the template store in {(time.perf_counter() - index_done) * 1000:.1f} ms")
+
+
+def __getattr__(name):
+    # ``core.model`` keeps working, loading the model on first access
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Answers for uploaded files, keyed by question and file content digest
+answer_cache = AnswerCache(persist_dir=os.environ.get("BUDDHIMATTA_CACHE_DIR"))
+
+# Upper bounds for /batch requests
+BATCH_MAX_QUESTIONS = int(os.environ.get("BUDDHIMATTA_BATCH_MAX_QUESTIONS", "1000"))
+BATCH_CONCURRENCY = int(os.environ.get("BUDDHIMATTA_BATCH_CONCURRENCY", "8"))
+
+STREAM_MEDIA_TYPES = {"text": "text/plain", "ndjson": "application/x-ndjson"}
+
+# Largest request body accepted, uploads included; 0 turns the check off
+MAX_BODY_BYTES = int(os.environ.get("BUDDHIMATTA_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+
+
+class AnswerResponse(BaseModel):
+    answer: str
+
+
+class FeedbackRequest(BaseModel):
+    question: str
+    correct_answer: str
+
+
+def save_question_for_training(question: str, answer: str):
+    """Save a question and its answer for future model training."""
+    get_model().add_qa_pair(question, answer)
+
+
+# One lock per upload: batch items naming the same file share its position
+_upload_locks = weakref.WeakKeyDictionary()
+
+
+def upload_lock(file: UploadFile) -> asyncio.Lock:
+    lock = _upload_locks.get(file)
+    if lock is None:
+        lock = _upload_locks[file] = asyncio.Lock()
+    return lock
+
+
+async def answer_question(question: str, file: Optional[UploadFile] = None,
+                          background_tasks: Optional[BackgroundTasks] = None) -> str:
+    """
+    Answer one question, optionally about an uploaded file.
+
+    Answers about a file depend on its content, so they are looked up and
+    stored in the answer cache under the question and the file's digest,
+    never in the model, which is keyed by question alone. The model only
+    answers a file question that no handler can.
+    """
+    if file is not None:
+        # Hashing and parsing seek and read the one spooled file, so
+        # questions about the same upload take turns
+        async with upload_lock(file):
+            return await answer_file_question(question, file)
+
+    # Check if the question is in our model
+    with stage("model_lookup"):
+        model_answer = await run_blocking("model_lookup", lambda: get_model().get_answer(question))
+    LOOKUPS.inc(source="model", result="hit" if model_answer else "miss")
+    if model_answer:
+        return model_answer
+
+    # Hand the question to the first registered handler that can answer it
+    answer = await registry.dispatch(question, None)
+    if answer is None:
+        return UNKNOWN_ANSWER
+
+    # Save this question-answer pair for future training
+    if background_tasks is not None:
+        background_tasks.add_task(save_question_for_training, question, answer)
+    else:
+        save_question_for_training(question, answer)
+    return answer
+
+
+async def answer_file_question(question: str, file: UploadFile) -> str:
+    """Answer a question about an upload, through the answer cache."""
+    # Identical uploads of the same question are answered from the cache
+    with stage("upload_hash"):
+        file_digest = await run_blocking("upload_hash", hash_upload, file.file)
+    # With a persist directory, reads and writes touch the disk
+    cached_answer = await run_blocking("answer_cache", answer_cache.get, question, file_digest)
+    LOOKUPS.inc(source="answer_cache", result="miss" if cached_answer is None else "hit")
+    if cached_answer is not None:
+        return cached_answer
+
+    answer = await registry.dispatch(question, file)
+    if answer is not None:
+        await run_blocking("answer_cache", answer_cache.put, question, file_digest, answer)
+        return answer
+
+    # No handler reads this file; a stored answer (say, from feedback) is the best left
+    with stage("model_lookup"):
+        model_answer = await run_blocking("model_lookup", lambda: get_model().get_answer(question))
+    LOOKUPS.inc(source="model", result="hit" if model_answer else "miss")
+    return model_answer or UNKNOWN_ANSWER
+
+
+async def read_batch(request: Request):
+    """
+    Parse a batch request into ``(items, files)``.
+
+    The body is a JSON list (or ``{"questions": [...]}``), NDJSON with one
+    item per line, or multipart form data with the list in a ``questions``
+    field alongside the uploads. Each item is a question string or an object
+    with ``question`` and an optional ``file`` naming an upload by field name
+    or filename.
+    """
+    content_type = request.headers.get("content-type", "")
+    files = {}
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            raw_items = json.loads(form.get("questions") or "[]")
+            for field, value in form.multi_items():
+                if not isinstance(value, str):
+                    files[field] = value
+                    files.setdefault(value.filename, value)
+        elif "ndjson" in content_type or "jsonlines" in content_type:
+            body = (await request.body()).decode("utf-8")
+            raw_items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            raw_items = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+
+    if isinstance(raw_items, dict):
+        raw_items = raw_items.get("questions", [])
+    if not isinstance(raw_items, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a list of questions")
+    if len(raw_items) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_QUESTIONS} questions")
+
+    items = []
+    for raw in raw_items:
+        if isinstance(raw, str):
+            raw = {"question": raw}
+        if not isinstance(raw, dict) or not isinstance(raw.get("question"), str):
+            raise HTTPException(status_code=400, detail="Each batch item needs a 'question' string")
+        items.append(raw)
+    return items, files
+
+
+def check_text(fileobj):
+    """
+    Decode a whole upload once and rewind it, so a file that is not UTF-8
+    fails before a streamed response has sent its status line.
+    """
+    for _ in iter_text(fileobj):
+        pass
+    fileobj.seek(0)
+
+
+def stream_file_content(fileobj, mode):
+    """Yield an upload's text as raw chunks or as ``{"chunk": ...}`` NDJSON lines."""
+    for text in iter_text(fileobj):
+        yield text if mode == "text" else json.dumps({"chunk": text}) + "\n"
+
+
+def stream_batch(items, files, background_tasks, concurrency=BATCH_CONCURRENCY):
+    """
+    Answer batch items concurrently and yield NDJSON lines in input order.
+
+    At most ``concurrency`` questions are in flight at once. Each line is
+    written as soon as its item and every item before it are answered, and
+    a failing item reports an ``error`` instead of failing the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer_item(index, item):
+        async with semaphore:
+            result = {"index": index}
+            file_ref = item.get("file")
+            try:
+                if file_ref is not None and file_ref not in files:
+                    raise HTTPException(status_code=400, detail=f"No uploaded file named '{file_ref}'")
+                result["answer"] = await answer_question(item["question"], files.get(file_ref), background_tasks)
+            except HTTPException as e:
+                result["error"] = e.detail
+            except Exception as e:
+                result["error"] = str(e)
+            return result
+
+    async def lines():
+        tasks = [asyncio.ensure_future(answer_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for task in tasks:
+                yield json.dumps(await task) + "\n"
+        finally:
+            # The client went away mid-stream; don't keep answering
+            for task in tasks:
+                task.cancel()
+
+    return lines()
+
+
+def create_app(prefix="/api", prefork_workers=True):
+    """
+    Build the FastAPI app with the question and feedback routes under ``prefix``.
+
+    ``prefork_workers`` starts the Python snippet workers and loads the
+    model at startup; on serverless platforms both happen on first use
+    instead, so a cold start only pays for what its request needs.
+    """
+    app = FastAPI(title="Buddhimatta - Assignment Answer API")
+
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_BODY_BYTES)
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if metrics.ENABLED:
+        @app.middleware("http")
+        async def record_request_time(request: Request, call_next):
+            start = time.perf_counter()
+            response = await call_next(request)
+            route = request.scope.get("route")
+            metrics.REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                route=route.path if route else "unmatched",
+                method=request.method,
+                status=response.status_code,
+            )
+            return response
+
+        @app.get("/metrics", response_class=PlainTextResponse)
+        async def export_metrics():
+            """Counters and histograms in the Prometheus text format."""
+            return metrics.registry.render()
+
+    if prefork_workers:
+        @app.on_event("startup")
+        async def warm_start():
+            get_snippet_pool().start()
+            await run_blocking("model_lookup", warm_up)
+
+    @app.on_event("shutdown")
+    async def stop_snippet_pool():
+        get_snippet_pool().close()
+        executors.shutdown()
+
+    @app.get("/")
+    async def root():
+        return {"message": "Welcome to Buddhimatta - Assignment Answer API"}
+
+    @app.post(prefix + "/", response_model=AnswerResponse)
+    async def process_question(
+        request: Request,
+        background_tasks: BackgroundTasks,
+        question: str = Form(...),
+        file: Optional[UploadFile] = File(None),
+        stream: Optional[str] = Form(None),
+    ):
+        if stream is not None:
+            if stream not in STREAM_MEDIA_TYPES:
+                raise HTTPException(status_code=400, detail=f"stream must be one of: {', '.join(STREAM_MEDIA_TYPES)}")
+            if file is not None and FILE_CONTENT_RE.search(question):
+                # The whole file is sent back without ever being held in memory
+                try:
+                    await run_blocking("file_parse", check_text, file.file)
+                except UnicodeDecodeError as e:
+                    raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
+                return StreamingResponse(stream_file_content(file.file, stream), media_type=STREAM_MEDIA_TYPES[stream])
+
+        answer, disconnected = await cancel_on_disconnect(
+            request.receive, answer_question(question, file, background_tasks))
+        if disconnected:
+            # Nobody is left to read it; 499 is the conventional "client closed request"
+            return Response(status_code=499)
+        return {"answer": answer}
+
+    @app.post(prefix + "/batch")
+    async def process_batch(request: Request):
+        """Answer a list of questions in one request, streamed back as NDJSON."""
+        items, files = await read_batch(request)
+        background_tasks = BackgroundTasks()
+        return StreamingResponse(
+            stream_batch(items, files, background_tasks),
+            media_type="application/x-ndjson",
+            background=background_tasks,
+        )
+
+    @app.post(prefix + "/feedback")
+    async def provide_feedback(feedback: FeedbackRequest):
+        """Endpoint to provide feedback with correct answers for questions."""
+        try:
+            # Save the feedback for future training
+            # A SQLite write, possibly waiting on another worker's, and on
+            # a cold start the model load too
+            await run_blocking("model_write", save_question_for_training, feedback.question,
+                               feedback.correct_answer)
+
+            return {"message": "Thank you for your feedback! This will help improve the system."}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing feedback: {str(e)}")
+
+    return app
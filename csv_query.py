@@ -0,0 +1,311 @@
+"""
+Aggregate queries over a CSV, parsed from the wording of a question.
+
+Handles questions such as::
+
+    What is the sum of the "amount" column where "region" is "North"?
+    How many rows have "score" greater than 50?
+    What is the average "price" for each "category"?
+
+``parse_query`` turns the question into a ``CsvQuery``, ``query_partials``
+aggregates a CSV stream for it in a single pass and ``format_result``
+turns the aggregate into the answer. With pandas installed the CSV is read in
+chunks restricted to the columns the query touches and each chunk is
+aggregated with vectorized operations, so memory stays bounded however
+large the file is; without pandas the same query streams through the
+``csv`` module row by row. Results from several files (see ``archive``)
+are combined with ``merge_partials``.
+"""
+import csv
+import itertools
+import json
+import math
+import re
+
+
+class MissingColumnError(ValueError):
+    """The query names a column the CSV header does not have."""
+
+    def __init__(self, column):
+        super().__init__(column)
+        self.column = column
+
+
+# Checked in order: "how many unique" is a distinct count, not a row count
+OPERATIONS = [
+    ("nunique", re.compile(r"\b(?:unique|distinct)\b", re.IGNORECASE)),
+    ("count", re.compile(r"\bhow many\b|\bnumber of (?:rows|records|entries|lines)\b|\bcount of\b", re.IGNORECASE)),
+    ("mean", re.compile(r"\b(?:average|mean)\b", re.IGNORECASE)),
+    ("sum", re.compile(r"\b(?:sum|total)\b", re.IGNORECASE)),
+    ("max", re.compile(r"\b(?:maximum|max|largest|highest)\b", re.IGNORECASE)),
+    ("min", re.compile(r"\b(?:minimum|min|smallest|lowest)\b", re.IGNORECASE)),
+]
+
+QUOTED = r'["\']([^"\']+)["\']'
+COMPARATORS = {
+    "is greater than or equal to": ">=", "is less than or equal to": "<=",
+    "greater than or equal to": ">=", "less than or equal to": "<=",
+    "is greater than": ">", "is less than": "<", "greater than": ">", "less than": "<",
+    "is not": "!=", "equals": "==", "is": "==",
+    ">=": ">=", "<=": "<=", "!=": "!=", "==": "==", "=": "==", ">": ">", "<": "<",
+}
+CONDITION_RE = re.compile(
+    QUOTED + r"\s*(?:column\s+)?("
+    + "|".join(re.escape(c) for c in sorted(COMPARATORS, key=len, reverse=True))
+    + r")\s*(" + QUOTED + r"|-?\d+(?:\.\d+)?)",
+    re.IGNORECASE,
+)
+GROUP_RE = re.compile(r"\b(?:for each|per|grouped by|group by)\s+(?:the\s+)?" + QUOTED, re.IGNORECASE)
+COLUMN_RE = re.compile(QUOTED + r"(?:\s+column)?")
+
+
+class CsvQuery:
+    """An aggregate ``op`` over ``column``, filtered by ``conditions``, optionally grouped."""
+
+    def __init__(self, op, column=None, conditions=(), group_by=None):
+        self.op = op
+        self.column = column
+        self.conditions = list(conditions)
+        self.group_by = group_by
+
+    @property
+    def columns(self):
+        """Every column the query reads, for ``usecols``."""
+        names = [self.column] if self.column else []
+        names += [column for column, _, _ in self.conditions]
+        if self.group_by:
+            names.append(self.group_by)
+        return list(dict.fromkeys(names))
+
+
+def _parse_value(text):
+    if text[0] in "\"'":
+        return text[1:-1]
+    return float(text)
+
+
+def parse_query(question):
+    """Return the ``CsvQuery`` a question asks for, or None if it is not one."""
+    op = next((name for name, pattern in OPERATIONS if pattern.search(question)), None)
+    if op is None:
+        return None
+
+    conditions = []
+    used_spans = []
+    for match in CONDITION_RE.finditer(question):
+        conditions.append((match.group(1), COMPARATORS[match.group(2).lower()], _parse_value(match.group(3))))
+        used_spans.append(match.span())
+
+    group_by = None
+    group_match = GROUP_RE.search(question)
+    if group_match:
+        group_by = group_match.group(1)
+        used_spans.append(group_match.span())
+
+    column = None
+    for match in COLUMN_RE.finditer(question):
+        if not any(start <= match.start() < end for start, end in used_spans):
+            column = match.group(1)
+            break
+
+    if column is None and op != "count":
+        return None
+    return CsvQuery(op, column, conditions, group_by)
+
+
+class _Partial:
+    """Running aggregate that chunks or rows are merged into."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.uniques = set()
+
+    def result(self, op):
+        if op == "count":
+            return self.count
+        if op == "nunique":
+            return len(self.uniques)
+        if self.count == 0:
+            return None
+        return {"sum": self.total, "mean": self.total / self.count,
+                "min": self.minimum, "max": self.maximum}[op]
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.uniques |= other.uniques
+
+
+def format_number(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, float):
+        return str(round(value, 10))
+    return str(value)
+
+
+def format_result(query, partials):
+    """The answer string for aggregated ``partials``."""
+    if query.group_by is None:
+        return format_number(partials[None].result(query.op))
+    grouped = {group: format_number(partials[group].result(query.op)) for group in sorted(partials)}
+    return json.dumps(grouped, ensure_ascii=False)
+
+
+def merge_partials(query, results):
+    """Combine the partials of several files into one set."""
+    merged = {}
+    if query.group_by is None:
+        merged[None] = _Partial()
+    for partials in results:
+        for group, partial in partials.items():
+            merged.setdefault(group, _Partial()).merge(partial)
+    return merged
+
+
+def _new_partials(query):
+    return {None: _Partial()} if query.group_by is None else {}
+
+
+def _run_pandas(pd, stream, header, delimiter, query, chunksize):
+    def numeric(series):
+        return pd.to_numeric(series, errors="coerce")
+
+    partials = _new_partials(query)
+    # Only the columns the query touches are parsed; the rest are skipped
+    # by the C reader without ever becoming Python objects
+    reader = pd.read_csv(stream, sep=delimiter, header=None, names=header, usecols=query.columns or [header[0]],
+                         chunksize=chunksize, dtype=str, keep_default_na=False, na_values=[""])
+    for chunk in reader:
+        for column, comparator, value in query.conditions:
+            if isinstance(value, float):
+                left = numeric(chunk[column])
+            else:
+                left = chunk[column]
+            mask = {
+                "==": left == value, "!=": left != value, ">": left > value,
+                "<": left < value, ">=": left >= value, "<=": left <= value,
+            }[comparator]
+            if isinstance(value, float):
+                # As in the csv fallback, a value that is not a number never matches
+                mask &= left.notna()
+            chunk = chunk[mask]
+
+        if query.group_by is None:
+            groups = [(None, chunk)]
+        else:
+            groups = chunk.groupby(chunk[query.group_by].fillna(""), sort=False)
+
+        for group, rows in groups:
+            partial = partials.setdefault(group, _Partial())
+            if query.op == "count":
+                partial.count += len(rows) if query.column is None else int(rows[query.column].notna().sum())
+            elif query.op == "nunique":
+                partial.uniques.update(rows[query.column].dropna().unique())
+            else:
+                values = numeric(rows[query.column]).dropna()
+                if len(values):
+                    partial.count += len(values)
+                    partial.total += float(values.sum())
+                    partial.minimum = min(partial.minimum, float(values.min()))
+                    partial.maximum = max(partial.maximum, float(values.max()))
+    return partials
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+CHECKS = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b, ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b, ">=": lambda a, b: a >= b, "<=": lambda a, b: a <= b,
+}
+
+
+def _aggregate_rows(rows, query):
+    """Aggregate ``{column: text}`` rows one at a time."""
+    partials = _new_partials(query)
+    for row in rows:
+        keep = True
+        for column, comparator, value in query.conditions:
+            left = _to_float(row[column]) if isinstance(value, float) else row[column]
+            if left is None or not CHECKS[comparator](left, value):
+                keep = False
+                break
+        if not keep:
+            continue
+
+        partial = partials.setdefault(row[query.group_by] if query.group_by else None, _Partial())
+        if query.op == "count":
+            if query.column is None or row[query.column] != "":
+                partial.count += 1
+        elif query.op == "nunique":
+            if row[query.column] != "":
+                partial.uniques.add(row[query.column])
+        else:
+            number = _to_float(row[query.column])
+            if number is not None:
+                partial.count += 1
+                partial.total += number
+                partial.minimum = min(partial.minimum, number)
+                partial.maximum = max(partial.maximum, number)
+    return partials
+
+
+def query_partials(stream, query, chunksize=100_000):
+    """
+    Aggregate a text stream of CSV data (or tab-separated, detected from
+    the header) into partials for ``format_result`` or ``merge_partials``.
+
+    Raises ``MissingColumnError`` if the header lacks a column the query names.
+    """
+    first_line = stream.readline()
+    delimiter = "\t" if "\t" in first_line and "," not in first_line else ","
+    header = next(csv.reader([first_line], delimiter=delimiter), [])
+    for column in query.columns:
+        if column not in header:
+            raise MissingColumnError(column)
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    if pd is not None:
+        return _run_pandas(pd, stream, header, delimiter, query, chunksize)
+    return _aggregate_rows(csv.DictReader(stream, fieldnames=header, delimiter=delimiter, restval=""), query)
+
+
+def query_records(stream, query):
+    """
+    Aggregate a JSON array of objects, or JSON lines, into partials.
+
+    Raises ``MissingColumnError`` if the first record lacks a column the
+    query names.
+    """
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+    if first == "[":
+        records = iter(json.loads(first + stream.read()))
+    else:
+        records = (json.loads(line) for line in itertools.chain([first + stream.readline()], stream) if line.strip())
+
+    def rows():
+        for i, record in enumerate(records):
+            if i == 0:
+                for column in query.columns:
+                    if column not in record:
+                        raise MissingColumnError(column)
+            yield {column: "" if record.get(column) is None else str(record[column]) for column in query.columns}
+
+    return _aggregate_rows(rows(), query)
+
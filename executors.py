@@ -0,0 +1,91 @@
+"""
+Bounded thread pools for the blocking stages of answering a question.
+
+Each stage (model lookup, upload hashing, file parsing, answer cache reads
+and writes, model writes) gets its own small pool, so the event loop never
+waits on disk or CPU-heavy work and a burst of one kind of work, say large
+zip uploads, can only occupy that stage's threads while lookups keep
+flowing. Pool sizes default to
+``STAGE_THREADS`` and can be overridden with ``BUDDHIMATTA_STAGE_THREADS``,
+e.g. ``"file_parse=4,upload_hash=2"``. Python snippets already run in their
+own worker processes (see ``sandbox.py``).
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+STAGE_THREADS = {"model_lookup": 4, "upload_hash": 2, "file_parse": 2, "answer_cache": 2, "model_write": 2}
+
+
+def _configured_threads():
+    threads = dict(STAGE_THREADS)
+    for item in os.environ.get("BUDDHIMATTA_STAGE_THREADS", "").split(","):
+        if "=" in item:
+            name, count = item.split("=", 1)
+            threads[name.strip()] = max(1, int(count))
+    return threads
+
+
+_threads = _configured_threads()
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def stage_pool(name):
+    """The thread pool for a stage, created on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = ThreadPoolExecutor(
+                    max_workers=_threads.get(name, 2), thread_name_prefix=f"buddhimatta-{name}")
+    return pool
+
+
+async def run_blocking(name, func, *args, **kwargs):
+    """
+    Run ``func`` in the pool for stage ``name`` and await its result.
+
+    Cancelling the caller drops the call if it is still queued; one already
+    running finishes in its thread and its result is discarded.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(stage_pool(name), functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+
+async def cancel_on_disconnect(receive, coro):
+    """
+    Await ``coro``, cancelling it if the client disconnects first.
+
+    ``receive`` is the request's ASGI receive callable; once the body has
+    been read, its next message is ``http.disconnect``. Returns
+    ``(result, disconnected)``.
+    """
+    task = asyncio.ensure_future(coro)
+
+    async def watch():
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                task.cancel()
+                return
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        return await task, False
+    except asyncio.CancelledError:
+        if watcher.done() and not watcher.cancelled():
+            return None, True
+        raise
+    finally:
+        watcher.cancel()
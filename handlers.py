@@ -0,0 +1,342 @@
+import codecs
+import io
+import os
+import re
+
+from fastapi import HTTPException
+
+from executors import run_blocking
+from metrics import stage
+from templates import TemplateStore, extract_template
+
+
+class HandlerRegistry:
+    """
+    Question handlers registered with a decorator and dispatched in one pass.
+
+    Each handler registers a precompiled regex plus the literal trigger
+    phrases it cannot match without. All triggers are folded into a single
+    alternation, so one scan over the question picks out the few handlers
+    worth trying, and only those run their full regex. Handlers are tried in
+    registration order; one that returns None passes the question on.
+
+    The handler that answers a question is remembered for its template, so
+    the next question of the same template goes straight to that handler.
+    A question of a template not seen before is compared with one question
+    of every solved template (see ``similarity.py``, when numpy is
+    installed); if the nearest differs from it in at most ``max_slots``
+    short spans, such as an unquoted column or student name, that
+    template's handler is tried first.
+    """
+
+    def __init__(self, similar_threshold=0.8, max_slots=3, max_slot_tokens=4):
+        self.handlers = []
+        self.templates = TemplateStore()
+        self.similar_threshold = similar_threshold
+        self.max_slots = max_slots
+        self.max_slot_tokens = max_slot_tokens
+        # One question per solved template; False once numpy turns out to be missing
+        self._solved = None
+        self._prefilter = None
+
+    def handler(self, pattern, triggers, flags=0, requires_file=False):
+        """Register ``func(question, file, match)`` for questions matching ``pattern``."""
+        def decorator(func):
+            self.handlers.append({
+                "func": func,
+                "matcher": re.compile(pattern, flags),
+                "triggers": list(triggers),
+                "requires_file": requires_file,
+            })
+            self._prefilter = None
+            return func
+        return decorator
+
+    def _compile_prefilter(self):
+        alternatives = []
+        for i, entry in enumerate(self.handlers):
+            literals = "|".join(re.escape(t) for t in entry["triggers"])
+            alternatives.append(f"(?P<h{i}>{literals})")
+        # Case-insensitive: it may let through a handler whose own regex then
+        # rejects the question, but never rules one out
+        return re.compile("|".join(alternatives), re.IGNORECASE)
+
+    def _try(self, i, question, has_file):
+        entry = self.handlers[i]
+        if entry["requires_file"] and not has_file:
+            return None
+        return entry["matcher"].search(question)
+
+    def candidates(self, question, has_file, preferred=None):
+        """
+        Yield ``(index, handler, match)`` for every handler that applies, in
+        order, starting with handler ``preferred`` if it applies.
+        """
+        if preferred is not None:
+            match = self._try(preferred, question, has_file)
+            if match:
+                yield preferred, self.handlers[preferred]["func"], match
+        if self._prefilter is None:
+            self._prefilter = self._compile_prefilter()
+        hit = set()
+        for found in self._prefilter.finditer(question):
+            hit.add(int(found.lastgroup[1:]))
+        hit.discard(preferred)
+        for i in sorted(hit):
+            match = self._try(i, question, has_file)
+            if match:
+                yield i, self.handlers[i]["func"], match
+
+    def _solved_index(self):
+        if self._solved is None:
+            try:
+                from similarity import SimilarityIndex
+            except ImportError:
+                self._solved = False
+            else:
+                self._solved = SimilarityIndex(initial_capacity=64)
+        return self._solved if self._solved is not False else None
+
+    def similar_solver(self, question):
+        """The handler index of the nearest solved template, if only a few short slots differ."""
+        solved = self._solved_index()
+        if solved is None or len(solved) == 0:
+            return None
+        found = solved.nearest_template(question, self.similar_threshold)
+        if found is None:
+            return None
+        stored, _, slots = found
+        if len(slots) > self.max_slots or any(
+                max(len(a.split()), len(b.split())) > self.max_slot_tokens for a, b in slots):
+            return None
+        return self.templates.get_solver(extract_template(stored))
+
+    async def dispatch(self, question, file):
+        """Return the first answer a matching handler produces, or None."""
+        template = extract_template(question)
+        known = self.templates.get_solver(template)
+        preferred = known
+        if preferred is None:
+            with stage("similar_template"):
+                preferred = self.similar_solver(question)
+        for i, func, match in self.candidates(question, file is not None, preferred):
+            with stage("handler", handler=func.__name__):
+                answer = await func(question, file, match)
+            if answer is not None:
+                if i != known:
+                    solved = self._solved_index()
+                    if known is None and solved is not None:
+                        solved.add(question)
+                    self.templates.set_solver(template, i)
+                return answer
+        return None
+
+
+registry = HandlerRegistry()
+
+# Worker processes for "output of the following Python code" questions,
+# created on first use so entry points that never see one skip the import
+_snippet_pool = None
+
+
+def get_snippet_pool():
+    global _snippet_pool
+    if _snippet_pool is None:
+        from sandbox import SnippetPool
+        _snippet_pool = SnippetPool()
+    return _snippet_pool
+
+
+# File-content answers longer than this are cut short
+MAX_CONTENT_CHARS = int(os.environ.get("BUDDHIMATTA_MAX_CONTENT_CHARS", "1000000"))
+
+FILE_CONTENT_RE = re.compile(r"What is the content of|What does the file contain")
+COLUMN_RE = re.compile(r'value in the ["\']?([^"\']*)["\']? column')
+PYTHON_BLOCK_RE = re.compile(r'```python\s*(.*?)\s*```', re.DOTALL)
+
+
+def iter_text(fileobj, chunk_size=64 * 1024):
+    """Yield the text of a binary file chunk by chunk, decoding UTF-8 incrementally."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        chunk = fileobj.read(chunk_size)
+        text = decoder.decode(chunk, final=not chunk)
+        if text:
+            yield text
+        if not chunk:
+            return
+
+
+def read_text(fileobj, max_chars=MAX_CONTENT_CHARS, chunk_size=64 * 1024):
+    """
+    Decode a binary file as UTF-8, reading at most enough of it for
+    ``max_chars`` characters. Returns ``(text, truncated)``.
+    """
+    parts, length = [], 0
+    for text in iter_text(fileobj, chunk_size):
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            return "".join(parts)[:max_chars], True
+    return "".join(parts), False
+
+
+def read_first_csv_value(zip_file, column_name="answer", question=""):
+    """
+    Return the first-row value of a column from a CSV in a zip.
+
+    The CSVs the question names (all of them if it names none) are tried in
+    archive order, and the first whose header has the column answers. Each
+    is decoded as a stream straight from the archive, so only headers and
+    one data row are ever decompressed and nothing is written to disk.
+    """
+    import csv
+    import zipfile
+
+    import archive
+
+    with stage("zip_open"):
+        zip_ref = zipfile.ZipFile(zip_file)
+        csv_formats = {extension: kind for extension, kind in archive.FORMATS.items() if kind == "csv"}
+        members = archive.select_members(zip_ref, question, formats=csv_formats)
+    with zip_ref, stage("csv_read"):
+        if not members:
+            raise HTTPException(status_code=400, detail="No CSV file found in the zip")
+
+        hints = archive.parse_encoding_hints(question)
+        for info in members:
+            with archive.open_member(zip_ref, info, hints) as stream:
+                first_line = stream.readline()
+                delimiter = "\t" if "\t" in first_line and "," not in first_line else ","
+                header = next(csv.reader([first_line], delimiter=delimiter), [])
+                if column_name not in header:
+                    continue
+                first_row = next(csv.reader(stream, delimiter=delimiter), None)
+                if first_row is None:
+                    raise HTTPException(status_code=400, detail="The CSV file has no data rows")
+                return first_row[header.index(column_name)]
+        raise HTTPException(status_code=400, detail=f"No '{column_name}' column found in the CSV")
+
+
+@registry.handler(
+    r"Download and unzip file.*\.zip.*What is the value in the.*column",
+    triggers=["Download and unzip file"],
+    flags=re.IGNORECASE,
+    requires_file=True,
+)
+async def answer_csv_in_zip(question, file, match):
+    """Questions about downloading and unzipping files."""
+    try:
+        # Extract the column name from the question
+        column_match = COLUMN_RE.search(question)
+        column_name = "answer"  # Default column name
+        if column_match:
+            column_name = column_match.group(1)
+
+        # Read the value straight out of the spooled upload
+        return await run_blocking("file_parse", read_first_csv_value, file.file, column_name, question)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+
+
+def query_upload(upload, question, query):
+    """
+    Answer a ``csv_query`` query over an uploaded CSV, or over every data
+    file in an uploaded zip that the question is about, combined.
+    """
+    import zipfile
+
+    import archive
+    from csv_query import MissingColumnError, format_result, merge_partials, query_partials, query_records
+
+    if not zipfile.is_zipfile(upload):
+        upload.seek(0)
+        stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        try:
+            return format_result(query, query_partials(stream, query))
+        finally:
+            # Leave the upload itself open for FastAPI to close
+            stream.detach()
+
+    hints = archive.parse_encoding_hints(question)
+
+    def aggregate(zip_ref, info):
+        with archive.open_member(zip_ref, info, hints) as stream:
+            try:
+                if archive.member_format(info) == "json":
+                    return query_records(stream, query)
+                return query_partials(stream, query)
+            except MissingColumnError as e:
+                return e
+
+    with zipfile.ZipFile(upload) as zip_ref:
+        members = archive.select_members(zip_ref, question)
+        if not members:
+            raise HTTPException(status_code=400, detail="No CSV file found in the zip")
+        results = archive.map_members(zip_ref, members, aggregate)
+    # Files without the queried columns are skipped, unless none has them
+    found = [result for result in results if not isinstance(result, MissingColumnError)]
+    if not found:
+        raise results[0]
+    return format_result(query, merge_partials(query, found))
+
+
+@registry.handler(
+    r"\bCSV\b|\.zip\b",
+    triggers=["csv", ".zip"],
+    flags=re.IGNORECASE,
+    requires_file=True,
+)
+async def answer_csv_query(question, file, match):
+    """Sum, mean, count, min/max and distinct-count questions over a CSV, with filters and grouping."""
+    from csv_query import MissingColumnError, parse_query
+
+    query = parse_query(question)
+    if query is None:
+        return None
+    try:
+        with stage("csv_query", op=query.op):
+            return await run_blocking("file_parse", query_upload, file.file, question, query)
+    except MissingColumnError as e:
+        raise HTTPException(status_code=400, detail=f"No '{e.column}' column found in the CSV")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+
+
+@registry.handler(
+    r"What is the output of the following Python code\?",
+    triggers=["What is the output of the following Python code?"],
+)
+async def answer_python_output(question, file, match):
+    """Questions about Python code execution."""
+    try:
+        # Extract the Python code from the question
+        code_match = PYTHON_BLOCK_RE.search(question)
+        if code_match:
+            # Execute the code in an isolated worker process
+            with stage("snippet_exec"):
+                return (await get_snippet_pool().run(code_match.group(1))).strip()
+    except Exception:
+        # Don't expose the error, just continue to other handlers
+        pass
+    return None
+
+
+@registry.handler(
+    FILE_CONTENT_RE.pattern,
+    triggers=["What is the content of", "What does the file contain"],
+    requires_file=True,
+)
+async def answer_file_content(question, file, match):
+    """Questions about file analysis (without zip)."""
+    try:
+        text, truncated = await run_blocking("file_parse", read_text, file.file)
+        if truncated:
+            print(f"Truncated the content of {file.filename} to {MAX_CONTENT_CHARS} characters")
+        return text.strip()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
@@ -0,0 +1,203 @@
+import hashlib
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# Curly quotes and primes collapse to plain ASCII quotes. Backticks are kept
+# because they fence code blocks.
+QUOTE_TABLE = str.maketrans({
+    "“": '"', "”": '"', "„": '"', "″": '"',
+    "‘": "'", "’": "'", "‚": "'", "′": "'",
+})
+WHITESPACE_RE = re.compile(r"\s+")
+TOKEN_RE = re.compile(r"\w+")
+CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+QUOTED_RE = re.compile(r'"([^"\n]{1,80})"')
+LITERAL_RE = re.compile(r'(```.*?```)|("[^"\n]{1,80}")', re.DOTALL)
+REQUIRED_PREFIXES = ("code:", "quoted:")
+
+
+def _fold(prose):
+    return WHITESPACE_RE.sub(" ", prose).casefold()
+
+
+def normalize_question(question):
+    """
+    Canonical form of a question used as the exact-match key.
+
+    Prose is casefolded and its whitespace collapsed. Fenced code blocks are
+    kept verbatim and double-quoted literals keep their case, since the
+    answer to ``print("HELLO")`` or a question about column ``"Answer"``
+    depends on both.
+    """
+    text = question
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(QUOTE_TABLE)
+    if '"' not in text and "```" not in text:
+        return _fold(text).strip()
+    parts = []
+    last = 0
+    for match in LITERAL_RE.finditer(text):
+        parts.append(_fold(text[last:match.start()]))
+        code, quoted = match.groups()
+        parts.append(code if code is not None else WHITESPACE_RE.sub(" ", quoted))
+        last = match.end()
+    parts.append(_fold(text[last:]))
+    return "".join(parts).strip()
+
+
+def is_required(token):
+    """Whether a fuzzy match must have exactly as many of ``token`` as the query."""
+    return token.startswith(REQUIRED_PREFIXES) or any(c.isdigit() for c in token)
+
+
+def tokenize(normalized):
+    """
+    Word token counts of an already normalized question.
+
+    Each fenced code block becomes one opaque ``code:<digest>`` token and
+    each double-quoted literal (usually a column name) a ``quoted:<text>``
+    token. These and every token containing a digit are required: a fuzzy
+    match must have the same ones, the same number of times, so two
+    questions about different code, columns or numbers never look alike
+    because of shared prose.
+    """
+    tokens = Counter()
+    for block in CODE_BLOCK_RE.findall(normalized):
+        tokens["code:" + hashlib.blake2b(block.encode("utf-8"), digest_size=8).hexdigest()] += 1
+    prose = CODE_BLOCK_RE.sub(" ", normalized)
+    tokens.update("quoted:" + literal for literal in QUOTED_RE.findall(prose))
+    tokens.update(TOKEN_RE.findall(prose))
+    return tokens
+
+
+def required_signature(tokens):
+    """The required tokens of a ``tokenize`` result with their counts, hashable."""
+    return frozenset((token, count) for token, count in tokens.items() if is_required(token))
+
+
+class QuestionIndex:
+    """
+    Two-level lookup from an incoming question to a stored question.
+
+    The first level is a hash of the normalized question, so whitespace,
+    prose casing and quote style never cause a miss. The second level is an
+    inverted index from word tokens to stored questions, scored with
+    TF-IDF cosine similarity. Only stored questions with the same required
+    tokens (see ``tokenize``) are candidates: when few share them they are
+    all scored, otherwise only the rarest tokens of the query are probed,
+    skipping any in more than ``max_posting_length`` questions. A lookup
+    thus reads a few short lists, never a scan over the corpus, at the cost
+    of missing a match that shares nothing but common words.
+    """
+
+    def __init__(self, max_probe_tokens=6, max_candidates=32, max_posting_length=2000):
+        self.max_probe_tokens = max_probe_tokens
+        self.max_candidates = max_candidates
+        self.max_posting_length = max_posting_length
+        self.exact = {}
+        self.questions = []
+        self.doc_tokens = []
+        self.doc_signatures = []
+        self.postings = {}
+        # Stored questions by required signature
+        self.by_signature = {}
+        # Document norms depend on corpus-wide IDF, so they are cached and
+        # recomputed only after the corpus has grown by 10%.
+        self._doc_norms = {}
+        self._doc_norms_size = 0
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, question):
+        """
+        Index a stored question. Re-adding a known question is a no-op.
+
+        Calls to ``add`` must be serialized by the caller; ``match`` may run
+        concurrently with them.
+        """
+        key = normalize_question(question)
+        if key in self.exact:
+            # Keep the latest spelling so lookups return the current dict key
+            self.questions[self.exact[key]] = question
+            return
+        doc_id = len(self.questions)
+        tokens = tokenize(key)
+        signature = required_signature(tokens)
+        # Publish the document before any key that points at it, so a
+        # concurrent lock-free match never sees a dangling doc id
+        self.doc_tokens.append(tokens)
+        self.doc_signatures.append(signature)
+        self.questions.append(question)
+        for token in tokens:
+            self.postings.setdefault(token, []).append(doc_id)
+        self.by_signature.setdefault(signature, []).append(doc_id)
+        self.exact[key] = doc_id
+
+    def _idf(self, token):
+        df = len(self.postings.get(token, ()))
+        return math.log((len(self.questions) + 1) / (df + 1)) + 1.0
+
+    def _candidates(self, tokens, signature, bucket, weights):
+        if len(bucket) <= self.max_candidates * 4:
+            return bucket
+        # Probe the rarest tokens first: their posting lists are short and
+        # any good match must share most of them.
+        known = [t for t in tokens if 0 < len(self.postings.get(t, ())) <= self.max_posting_length]
+        known.sort(key=lambda t: len(self.postings[t]))
+        overlap = {}
+        for token in known[:self.max_probe_tokens]:
+            weight = weights[token]
+            for candidate in self.postings[token]:
+                overlap[candidate] = overlap.get(candidate, 0.0) + weight
+        matching = [doc_id for doc_id in overlap if self.doc_signatures[doc_id] == signature]
+        return heapq.nlargest(self.max_candidates, matching, key=overlap.get)
+
+    def match(self, question, threshold=0.0):
+        """
+        Find the stored question closest to ``question``.
+
+        Returns ``(stored_question, score)`` where ``score`` is 1.0 for a
+        normalized exact match, or ``None`` if nothing scores at least
+        ``threshold``.
+        """
+        key = normalize_question(question)
+        doc_id = self.exact.get(key)
+        if doc_id is not None:
+            return self.questions[doc_id], 1.0
+
+        tokens = tokenize(key)
+        signature = required_signature(tokens)
+        # The answer depends on the exact code, literals and numbers
+        bucket = self.by_signature.get(signature)
+        if not bucket:
+            return None
+
+        idf = {t: self._idf(t) for t in tokens}
+        weights = {t: count * idf[t] ** 2 for t, count in tokens.items()}
+        candidates = self._candidates(tokens, signature, bucket, weights)
+        if len(self.questions) > self._doc_norms_size * 1.1:
+            self._doc_norms = {}
+            self._doc_norms_size = len(self.questions)
+
+        query_norm = math.sqrt(sum((count * idf[t]) ** 2 for t, count in tokens.items()))
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            doc_tokens = self.doc_tokens[candidate]
+            shared = sum(weights[t] * doc_tokens[t] for t in tokens if t in doc_tokens)
+            if not shared:
+                continue
+            doc_norm = self._doc_norms.get(candidate)
+            if doc_norm is None:
+                doc_norm = math.sqrt(sum((count * self._idf(t)) ** 2 for t, count in doc_tokens.items()))
+                self._doc_norms[candidate] = doc_norm
+            score = shared / (query_norm * doc_norm)
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is None or best_score < threshold:
+            return None
+        return self.questions[best], best_score
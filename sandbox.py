@@ -0,0 +1,278 @@
+import ast
+import asyncio
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; jobs still run isolated, just without rlimits
+    resource = None
+
+
+class SnippetError(Exception):
+    """Raised when a snippet fails, times out or exceeds its limits."""
+
+
+# Modules whose functions give the same result on every run
+PURE_MODULES = {
+    "math", "cmath", "itertools", "functools", "operator", "collections", "string", "re", "json",
+    "statistics", "fractions", "decimal", "heapq", "bisect", "textwrap", "unicodedata", "dataclasses",
+    "typing", "enum", "copy", "pprint", "numbers", "array", "struct", "base64", "binascii", "hashlib",
+}
+# Builtins that reach outside the snippet, whose result varies between runs
+# (object addresses, string hash seeds), or that reach other builtins by name
+IMPURE_NAMES = {
+    "open", "input", "eval", "exec", "compile", "__import__", "globals", "locals", "vars",
+    "breakpoint", "help", "exit", "quit", "id", "hash", "set", "frozenset", "memoryview",
+    "__builtins__", "getattr", "setattr", "delattr",
+}
+
+# Operators that dict views, like sets, answer with a set
+SET_OPERATORS = (ast.BitOr, ast.BitAnd, ast.BitXor, ast.Sub)
+
+
+def snippet_key(code):
+    return hashlib.blake2b(code.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def is_deterministic(code):
+    """
+    Whether a snippet's output is sure to be the same on every run.
+
+    Conservative: it must import only ``PURE_MODULES``, avoid
+    ``IMPURE_NAMES`` and dunder names, even as strings, and build no sets,
+    since the iteration order of a set of strings changes with the hash
+    seed of each process. That includes set operations on dict views
+    (``a.keys() | b.keys()``), so a snippet that takes ``keys()`` or
+    ``items()`` and also uses ``|``, ``&``, ``^`` or ``-`` is rejected.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    takes_views = uses_set_operators = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] not in PURE_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or "").split(".")[0] not in PURE_MODULES:
+                return False
+        elif isinstance(node, ast.Name) and node.id in IMPURE_NAMES:
+            return False
+        elif isinstance(node, ast.Attribute) and node.attr.startswith("__") and node.attr != "__name__":
+            return False
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.startswith("__"):
+            return False
+        elif isinstance(node, (ast.Set, ast.SetComp)):
+            return False
+        elif isinstance(node, (ast.BinOp, ast.AugAssign)) and isinstance(node.op, SET_OPERATORS):
+            uses_set_operators = True
+        if isinstance(node, ast.Attribute) and node.attr in ("keys", "items"):
+            takes_views = True
+    return not (takes_views and uses_set_operators)
+
+
+def _address_space_size():
+    """Current virtual memory size of this process in bytes, if known."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _worker_main(conn, memory_limit, max_output, code_cache_entries=128):
+    """Loop run by each worker process: receive code, exec it, send output."""
+    if resource is not None and memory_limit:
+        # A forked worker inherits the server's address space, so the limit
+        # is on top of what is already mapped.
+        baseline = _address_space_size()
+        if baseline is not None:
+            limit = baseline + memory_limit
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    if resource is not None:
+        cpu_hard_limit = resource.getrlimit(resource.RLIMIT_CPU)[1]
+
+    # Compiled code objects by snippet, so a repeated snippet skips parsing
+    compiled = OrderedDict()
+
+    while True:
+        try:
+            code, cpu_time = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+
+        if resource is not None and cpu_time:
+            # RLIMIT_CPU is cumulative for the process, so move the soft
+            # limit to the CPU already used plus this job's budget. Exceeding
+            # it delivers SIGXCPU, which kills the worker. The hard limit is
+            # left alone: once lowered, it could never be raised again.
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime + cpu_time) + 1
+            if cpu_hard_limit != resource.RLIM_INFINITY:
+                soft = min(soft, cpu_hard_limit)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, cpu_hard_limit))
+
+        output = io.StringIO()
+        try:
+            key = snippet_key(code)
+            code_object = compiled.get(key)
+            if code_object is None:
+                code_object = compiled[key] = compile(code, "<string>", "exec")
+                if len(compiled) > code_cache_entries:
+                    compiled.popitem(last=False)
+            else:
+                compiled.move_to_end(key)
+            with contextlib.redirect_stdout(output):
+                exec(code_object, {"__name__": "__main__"})
+            result = ("ok", output.getvalue()[:max_output])
+        except MemoryError:
+            result = ("error", "Memory limit exceeded")
+        except BaseException as e:
+            result = ("error", f"{type(e).__name__}: {e}")
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, context, memory_limit, max_output, code_cache_entries):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit, max_output, code_cache_entries),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SnippetPool:
+    """
+    Pool of pre-forked worker processes that execute Python snippets.
+
+    Each job runs in its own worker with a wall-clock timeout, a CPU-time
+    limit and an address-space limit, and its stdout is captured inside that
+    worker. A worker that times out or dies is killed and replaced, so a bad
+    snippet never takes the server or other jobs down with it.
+
+    Each worker keeps the compiled code of its last ``code_cache_entries``
+    snippets. The pool remembers the output, if no longer than
+    ``max_cached_output`` characters, of up to ``output_cache_entries``
+    snippets that ``is_deterministic`` accepts and answers repeats of them
+    without running anything.
+    """
+
+    def __init__(self, workers=None, timeout=5.0, cpu_time=5, memory_limit=256 * 1024 * 1024,
+                 max_output=1024 * 1024, code_cache_entries=128, output_cache_entries=256,
+                 max_cached_output=64 * 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cpu_time = cpu_time
+        self.memory_limit = memory_limit
+        self.max_output = max_output
+        self.code_cache_entries = code_cache_entries
+        self.output_cache_entries = output_cache_entries
+        self.max_cached_output = max_cached_output
+        self._outputs = OrderedDict()
+        self._outputs_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.memory_limit, self.max_output, self.code_cache_entries)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+
+    def _retire(self, worker):
+        worker.kill()
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+
+    def start(self):
+        """Fork the workers up front so the first job does not pay for it."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+
+    def close(self):
+        """Kill every worker."""
+        with self._lock:
+            workers, self._all = self._all, []
+            self._started = False
+        for worker in workers:
+            worker.kill()
+        self._idle = queue.Queue()
+
+    def run_sync(self, code):
+        """Run a snippet and return its captured stdout, blocking the caller."""
+        cacheable = self.output_cache_entries and is_deterministic(code)
+        if cacheable:
+            key = snippet_key(code)
+            with self._outputs_lock:
+                output = self._outputs.get(key)
+                if output is not None:
+                    self._outputs.move_to_end(key)
+                    self.hits += 1
+                    return output
+                self.misses += 1
+        output = self._execute(code)
+        # A default repr with an object address differs from run to run
+        if cacheable and len(output) <= self.max_cached_output and " at 0x" not in output:
+            with self._outputs_lock:
+                self._outputs[key] = output
+                if len(self._outputs) > self.output_cache_entries:
+                    self._outputs.popitem(last=False)
+        return output
+
+    def _execute(self, code):
+        self.start()
+        worker = self._idle.get()
+        try:
+            worker.conn.send((code, self.cpu_time))
+            if not worker.conn.poll(self.timeout):
+                raise SnippetError(f"Execution timed out after {self.timeout} seconds")
+            status, payload = worker.conn.recv()
+        except SnippetError:
+            self._retire(worker)
+            worker = self._spawn()
+            raise
+        except (EOFError, OSError):
+            # The worker died, most likely from SIGXCPU or SIGKILL
+            self._retire(worker)
+            worker = self._spawn()
+            raise SnippetError("Execution exceeded its resource limits")
+        finally:
+            self._idle.put(worker)
+
+        if status != "ok":
+            raise SnippetError(payload)
+        return payload
+
+    async def run(self, code):
+        """Run a snippet in the pool without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run_sync, code)
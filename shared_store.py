@@ -0,0 +1,143 @@
+"""
+Question-answer store shared by every worker process through SQLite.
+
+With ``uvicorn --workers N`` each worker would otherwise hold its own copy
+of the corpus and never see pairs added by the others. Pointing every
+worker's model at the same database (``BUDDHIMATTA_SHARED_DB``) gives one
+copy on disk, served to all of them from the OS page cache through SQLite's
+memory-mapped I/O, and a write in one worker is visible to the next lookup
+in every other worker.
+"""
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+from question_index import normalize_question
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question TEXT NOT NULL UNIQUE,
+    normalized TEXT NOT NULL,
+    answer TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS qa_normalized ON qa (normalized);
+"""
+# Bumped whenever normalize_question changes, so stored keys are recomputed
+NORMALIZATION_VERSION = 1
+
+
+class SQLitePairs(MutableMapping):
+    """
+    ``{question: answer}`` mapping stored in a SQLite database in WAL mode.
+
+    Each thread gets its own connection, so readers never block each other
+    or a writer. Updates use ``INSERT OR REPLACE``, which gives a changed
+    pair a new, higher row id; ``poll_new_questions`` uses that to report
+    pairs written by any process since the last call.
+    """
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024, busy_timeout_ms=5000):
+        self.path = path
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        conn = self._connect()
+        # WAL mode is a property of the database file, so set it once here
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._renormalize(conn)
+        # data_version is only comparable on one connection, so polling for
+        # changes gets a dedicated one
+        self._poll_conn = self._connect(check_same_thread=False)
+        self._poll_lock = threading.Lock()
+        self._seen_id = 0
+        self._seen_version = None
+
+    def _renormalize(self, conn):
+        """Recompute the ``normalized`` column if it predates the current normalization."""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= NORMALIZATION_VERSION:
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another worker may have done it while this one waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= NORMALIZATION_VERSION:
+                return
+            rows = conn.execute("SELECT id, question FROM qa").fetchall()
+            conn.executemany("UPDATE qa SET normalized = ? WHERE id = ?",
+                             ((normalize_question(question), row_id) for row_id, question in rows))
+            conn.execute(f"PRAGMA user_version={NORMALIZATION_VERSION}")
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                               check_same_thread=check_same_thread)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def __getitem__(self, question):
+        row = self._conn().execute("SELECT answer FROM qa WHERE question = ?", (question,)).fetchone()
+        if row is None:
+            raise KeyError(question)
+        return row[0]
+
+    def __setitem__(self, question, answer):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO qa (question, normalized, answer) VALUES (?, ?, ?)",
+            (question, normalize_question(question), answer),
+        )
+
+    def __delitem__(self, question):
+        cursor = self._conn().execute("DELETE FROM qa WHERE question = ?", (question,))
+        if cursor.rowcount == 0:
+            raise KeyError(question)
+
+    def __iter__(self):
+        for (question,) in self._conn().execute("SELECT question FROM qa ORDER BY id"):
+            yield question
+
+    def __len__(self):
+        return self._conn().execute("SELECT count(*) FROM qa").fetchone()[0]
+
+    def update_many(self, pairs, replace=True):
+        """Write many pairs in one transaction."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"{verb} INTO qa (question, normalized, answer) VALUES (?, ?, ?)",
+                ((question, normalize_question(question), answer) for question, answer in pairs),
+            )
+
+    def find_normalized(self, question):
+        """Lookup by normalized question through the ``normalized`` index."""
+        row = self._conn().execute(
+            "SELECT answer FROM qa WHERE normalized = ? ORDER BY id DESC LIMIT 1",
+            (normalize_question(question),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def poll_new_questions(self):
+        """
+        Questions added or changed by any process since the previous call.
+
+        ``PRAGMA data_version`` only changes when another connection commits,
+        so the common case of nothing new costs a single pragma read.
+        """
+        with self._poll_lock:
+            conn = self._poll_conn
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._seen_version:
+                return []
+            self._seen_version = version
+            rows = conn.execute("SELECT id, question FROM qa WHERE id > ? ORDER BY id", (self._seen_id,)).fetchall()
+            if rows:
+                self._seen_id = rows[-1][0]
+            return [question for _, question in rows]
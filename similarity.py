@@ -0,0 +1,118 @@
+"""
+Nearest-neighbour search over stored questions with hashed n-gram embeddings.
+
+Each question is embedded as a bag of word unigrams and bigrams plus
+character trigrams, hashed with a random sign into a fixed number of
+dimensions and L2-normalized. The embeddings live in one float32 matrix
+that grows by doubling, so adding a question is an append rather than a
+rebuild, and the top-k most similar questions are one matrix-vector product
+away. Unlike ``QuestionIndex``, which needs shared words, this tolerates
+typos and reworded prose, and ``nearest_template`` reports how the closest
+stored question differs from the one asked (a column name, a number, a file
+name) so a caller can reuse its answer or handler with those slots swapped.
+``HandlerRegistry`` uses it to pick a handler for a template it has not
+seen. Requires numpy.
+"""
+import difflib
+import re
+import zlib
+
+import numpy as np
+
+from question_index import normalize_question
+
+WORD_RE = re.compile(r"\w+")
+SLOT_TOKEN_RE = re.compile(r"\"[^\"\n]*\"|'[^'\n]*'|\d+(?:\.\d+)?|\w+|[^\w\s]")
+
+
+def slot_differences(template, question):
+    """``[(template text, question text), ...]`` for each span where the two differ."""
+    a = SLOT_TOKEN_RE.findall(template)
+    b = SLOT_TOKEN_RE.findall(question)
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return [(" ".join(a[i1:i2]), " ".join(b[j1:j2]))
+            for op, i1, i2, j1, j2 in matcher.get_opcodes() if op != "equal"]
+
+
+class SimilarityIndex:
+    """
+    Hashed bag-of-n-grams embeddings of stored questions, searched by cosine.
+
+    Calls to ``add`` must be serialized by the caller; ``nearest`` may run
+    concurrently with them.
+    """
+
+    def __init__(self, dim=1024, initial_capacity=1024):
+        self.dim = dim
+        self.questions = []
+        self.rows = {}
+        self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _features(self, key):
+        words = WORD_RE.findall(key)
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {key} "
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, question):
+        """Unit-length embedding of a question (all zeros if it has no text)."""
+        hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in self._features(normalize_question(question))],
+                          dtype=np.uint32)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        # The top bit picks the sign, so colliding features tend to cancel
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+    def add(self, question):
+        """Embed and append a question; re-adding one replaces its row."""
+        key = normalize_question(question)
+        vector = self.embed(question)
+        row = self.rows.get(key)
+        if row is not None:
+            self._matrix[row] = vector
+            self.questions[row] = question
+            return
+        row = self._size
+        if row == len(self._matrix):
+            grown = np.zeros((2 * len(self._matrix), self.dim), dtype=np.float32)
+            grown[:row] = self._matrix[:row]
+            self._matrix = grown
+        # Publish the row before the size that makes it visible
+        self._matrix[row] = vector
+        self.questions.append(question)
+        self.rows[key] = row
+        self._size = row + 1
+
+    def nearest(self, question, k=5):
+        """The ``k`` most similar stored questions as ``[(question, score), ...]``, best first."""
+        size = self._size
+        matrix = self._matrix
+        if size == 0:
+            return []
+        scores = matrix[:size] @ self.embed(question)
+        k = min(k, size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.questions[i], float(scores[i])) for i in top]
+
+    def nearest_template(self, question, threshold=0.0):
+        """
+        The closest stored question, its score and the slots that differ.
+
+        Returns ``(stored_question, score, slots)`` with ``slots`` as in
+        ``slot_differences``, or None if nothing scores at least ``threshold``.
+        """
+        found = self.nearest(question, k=1)
+        if not found or found[0][1] < threshold:
+            return None
+        stored, score = found[0]
+        return stored, score, slot_differences(stored, question)
@@ -0,0 +1,209 @@
+"""
+Binary, memory-mapped snapshots of the question-answer store.
+
+A snapshot is a header, which also records the size and digest of the
+JSON file it was built from, a table of fixed-size entries sorted by the 64-bit
+hash of each normalized question, and an arena holding the UTF-8 text of
+every question and answer. Opening one only maps the file; a lookup is a
+binary search over the table plus decoding the one entry it lands on, so
+startup cost does not grow with the size of the corpus.
+
+Build one from the JSON store before deploying with::
+
+    python snapshot.py [model_data.json] [model_data.bin]
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections.abc import MutableMapping
+
+from question_index import normalize_question
+
+# Changes whenever the layout or normalize_question does, so stale files are rejected
+MAGIC = b"BMQASNP3"
+# magic, entry count, source JSON size, source JSON digest
+HEADER = struct.Struct("<8sIQ16s")
+# question hash, question offset, question length, answer offset, answer length
+ENTRY = struct.Struct("<QQIQI")
+
+
+def _hash_normalized(normalized):
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def question_hash(question):
+    return _hash_normalized(normalize_question(question))
+
+
+def source_fingerprint(path, chunk_size=1024 * 1024):
+    """``(size, digest)`` of a file, as recorded in the header of a snapshot built from it."""
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.digest()
+
+
+def built_from(path, source):
+    """
+    Whether the snapshot at ``path`` was built from ``source`` as it is now.
+
+    Compares content, not modification times, which a checkout or copy
+    resets without regard to which file is newer.
+    """
+    try:
+        with open(path, "rb") as f:
+            magic, _, size, digest = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    if magic != MAGIC or size != os.path.getsize(source):
+        return False
+    return (size, digest) == source_fingerprint(source)
+
+
+def write_snapshot(qa_pairs, path, source=None):
+    """
+    Compile ``{question: answer}`` into a snapshot file, atomically.
+
+    ``source`` is the JSON file the pairs were loaded from, if any; its
+    fingerprint goes in the header for ``built_from``.
+    """
+    size, digest = source_fingerprint(source) if source else (0, bytes(16))
+    entries = {}
+    for question, answer in qa_pairs.items():
+        # Questions that normalize identically share a slot; the last one wins
+        entries[normalize_question(question)] = (question, answer)
+
+    table = sorted(
+        (_hash_normalized(normalized), question.encode("utf-8"), answer.encode("utf-8"))
+        for normalized, (question, answer) in entries.items()
+    )
+    arena_start = HEADER.size + ENTRY.size * len(table)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(table), size, digest))
+        offset = arena_start
+        for key, question, answer in table:
+            f.write(ENTRY.pack(key, offset, len(question), offset + len(question), len(answer)))
+            offset += len(question) + len(answer)
+        for _, question, answer in table:
+            f.write(question)
+            f.write(answer)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(table)
+
+
+class QASnapshot:
+    """Read-only view of a snapshot file through ``mmap``."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a question-answer snapshot")
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+
+    def _text(self, offset, length):
+        return self._map[offset:offset + length].decode("utf-8")
+
+    def find(self, question):
+        """Return ``(stored_question, answer)`` for a normalized match, or None."""
+        key = question_hash(question)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        normalized = normalize_question(question)
+        while lo < self.count:
+            entry_key, q_off, q_len, a_off, a_len = self._entry(lo)
+            if entry_key != key:
+                break
+            stored = self._text(q_off, q_len)
+            if normalize_question(stored) == normalized:
+                return stored, self._text(a_off, a_len)
+            lo += 1
+        return None
+
+    def items(self):
+        for i in range(self.count):
+            _, q_off, q_len, a_off, a_len = self._entry(i)
+            yield self._text(q_off, q_len), self._text(a_off, a_len)
+
+    def close(self):
+        self._map.close()
+
+
+class SnapshotPairs(MutableMapping):
+    """
+    ``{question: answer}`` mapping over a snapshot plus an in-memory overlay.
+
+    Reads check the overlay first and then the snapshot; writes only touch
+    the overlay, which is folded into a new snapshot on compaction.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.overlay = {}
+        self._new_keys = 0
+
+    def __getitem__(self, question):
+        if question in self.overlay:
+            return self.overlay[question]
+        found = self.snapshot.find(question)
+        if found is None or found[0] != question:
+            raise KeyError(question)
+        return found[1]
+
+    def __setitem__(self, question, answer):
+        if question not in self:
+            self._new_keys += 1
+        self.overlay[question] = answer
+
+    def __delitem__(self, question):
+        raise TypeError("pairs stored in a snapshot cannot be deleted")
+
+    def __iter__(self):
+        for question, _ in self.snapshot.items():
+            if question not in self.overlay:
+                yield question
+        yield from self.overlay
+
+    def __len__(self):
+        return len(self.snapshot) + self._new_keys
+
+    def find_normalized(self, question):
+        """Snapshot lookup by normalized question, without building an index."""
+        found = self.snapshot.find(question)
+        if found is None:
+            return None
+        stored, answer = found
+        return self.overlay.get(stored, answer)
+
+
+if __name__ == "__main__":
+    from train_model import BuddhimattaModel
+
+    data_file = sys.argv[1] if len(sys.argv) > 1 else "model_data.json"
+    snapshot_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(data_file)[0] + ".bin"
+    source = BuddhimattaModel(data_file, snapshot_file=snapshot_file)
+    count = write_snapshot(source.qa_pairs, snapshot_file, source=data_file)
+    print(f"Wrote {count} question-answer pairs to {snapshot_file}")
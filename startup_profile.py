@@ -0,0 +1,85 @@
+"""
+Startup profile: what a cold start spends its time on.
+
+    python startup_profile.py              # profile "import main"
+    python startup_profile.py --top 30 --module vercel_main
+
+Imports the module in a fresh interpreter under ``python -X importtime``,
+lists the modules with the highest cumulative import cost, then times
+loading the model and building its question index and template store,
+which ``core`` defers until the first request or ``warm_up``.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def cold_import(module="main", importtime=False, env=None):
+    """
+    Import ``module`` in a fresh interpreter.
+
+    Returns ``(wall_ms, model_loaded, stderr)``: the time the import took,
+    whether it loaded the model, and the ``-X importtime`` report if asked for.
+    """
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = (time.perf_counter() - start) * 1000\n"
+        "core = sys.modules.get('core')\n"
+        "print(elapsed, core is not None and core._model is not None)\n"
+    )
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    result = subprocess.run(args, cwd=BASE_DIR, env=env or os.environ.copy(), capture_output=True, text=True,
+                            check=True)
+    elapsed, loaded = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed), loaded == "True", result.stderr
+
+
+def parse_importtime(report):
+    """``[(module, self_us, cumulative_us, depth), ...]`` from a ``-X importtime`` report."""
+    rows = []
+    for line in report.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the cold start of the API.")
+    parser.add_argument("--module", default="main", help="module to import, as the server would")
+    parser.add_argument("--top", type=int, default=20, help="how many of the slowest imports to list")
+    args = parser.parse_args()
+
+    elapsed, loaded, report = cold_import(args.module, importtime=True)
+    rows = parse_importtime(report)
+    print(f"import {args.module}: {elapsed:.1f} ms (model loaded at import: {'yes' if loaded else 'no'})\n")
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:13.1f} {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+
+    local = sorted(
+        (row for row in rows if os.path.exists(os.path.join(BASE_DIR, row[0].split(".")[0] + ".py"))),
+        key=lambda row: -row[1],
+    )
+    print("\nThis repository's modules (self time):")
+    for name, self_us, _, _ in local:
+        print(f"{self_us / 1000:8.1f} ms  {name}")
+
+    print("\nDeferred work, as the first request or warm_up() would do it:")
+    sys.path.insert(0, BASE_DIR)
+    os.environ["BUDDHIMATTA_PROFILE_STARTUP"] = "1"
+    import core
+    core.warm_up()
+
+
+if __name__ == "__main__":
+    main()
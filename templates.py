@@ -0,0 +1,114 @@
+"""
+Question templates: the fixed wording of a question with its variable parts
+(quoted literals, file names, numbers, URLs, code blocks) pulled out.
+
+Assignment questions are generated from a small number of templates, so
+``extract_template`` splitting a question into a template id and its
+parameters turns two kinds of lookup into dictionary hits: a stored answer
+for the same template and parameters, and the handler that answered an
+earlier question of the same template (see ``HandlerRegistry.dispatch``).
+
+Only the handler lookup holds regardless of parameter values. Answers
+depend on the parameters, so they stay keyed by them: the store does not
+shrink the corpus, and an answer lookup hits only where a normalized exact
+match would, give or take the spelling of numbers.
+"""
+import hashlib
+import re
+
+from question_index import normalize_question
+
+SLOT_RE = re.compile(
+    r"(?P<code>```.*?```)"
+    r'|"(?P<quoted>[^"\n]*)"'
+    r"|(?P<url>https?://\S+)"
+    r"|(?P<email>[\w.+-]+@[\w-]+(?:\.[\w-]+)+)"
+    r"|(?P<file>\b[\w-]+\.(?:zip|csv|tsv|json|jsonl|txt|md|py|js|html|xml|pdf|png|jpe?g|webp|sql|xlsx?)\b)"
+    r"|(?P<number>(?<![\w.])-?\d+(?:\.\d+)?(?![\w.]))",
+    re.DOTALL,
+)
+
+
+class Template:
+    __slots__ = ("id", "text", "params")
+
+    def __init__(self, id, text, params):
+        self.id = id
+        self.text = text
+        self.params = params
+
+    def __repr__(self):
+        return f"Template({self.id!r}, {self.text!r}, {self.params!r})"
+
+
+def _canonical_number(text):
+    # Rewritten as text: through float, long integers lose digits and merge
+    sign = "-" if text.startswith("-") else ""
+    integer, dot, fraction = text.lstrip("-").partition(".")
+    return sign + (integer.lstrip("0") or "0") + dot + fraction
+
+
+def extract_template(question):
+    """
+    Split a question into its template and parameters.
+
+    Works on the normalized question, so the template and parameters are
+    casefolded and whitespace-collapsed. Leading zeros are dropped from
+    numbers, so ``5`` and ``05`` are the same parameter, but ``5`` and
+    ``5.0``, or ``1.1`` and ``1.10``, are not.
+    """
+    normalized = normalize_question(question)
+    params = []
+    parts = []
+    last = 0
+    for match in SLOT_RE.finditer(normalized):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            value = _canonical_number(value)
+        params.append(value)
+        parts.append(normalized[last:match.start()])
+        parts.append(f"<{kind}>")
+        last = match.end()
+    parts.append(normalized[last:])
+    text = "".join(parts)
+    template_id = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    return Template(template_id, text, tuple(params))
+
+
+class TemplateStore:
+    """
+    Values and solvers keyed by template.
+
+    ``values`` maps template id to ``{params: value}``, where the value is
+    an answer or anything that leads to one (the model stores the question
+    its answer is filed under), and ``solvers`` maps template id to whatever
+    the caller uses to compute an answer (the registry stores a handler
+    index). Single dictionary operations are atomic, so lookups need no lock.
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self.values = {}
+        self.solvers = {}
+
+    def __len__(self):
+        return len(self.templates)
+
+    def add(self, question, value):
+        template = extract_template(question)
+        self.templates.setdefault(template.id, template.text)
+        self.values.setdefault(template.id, {})[template.params] = value
+        return template
+
+    def get(self, question, template=None):
+        """The value stored for a question's template and parameters, or None."""
+        template = template or extract_template(question)
+        return self.values.get(template.id, {}).get(template.params)
+
+    def set_solver(self, template, solver):
+        self.templates.setdefault(template.id, template.text)
+        self.solvers[template.id] = solver
+
+    def get_solver(self, template):
+        return self.solvers.get(template.id)
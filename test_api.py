@@ -1,4 +1,5 @@
 import requests
+import io
 import json
 import os
 from pathlib import Path
@@ -9,6 +10,9 @@ import pandas as pd
 # URL of your deployed API
 API_URL = "http://localhost:8000/api/"  # Change this to your deployed URL
 
+# Most a cold "import main" may take, in milliseconds
+IMPORT_BUDGET_MS = float(os.environ.get("BUDDHIMATTA_IMPORT_BUDGET_MS", "1000"))
+
 def test_known_question():
     """Test a known question that should be in the model."""
     question = "Install and run Visual Studio Code. In your Terminal (or Command Prompt), type code -s and press Enter. Copy and paste the entire output below. What is the output ofcode -s?"
@@ -63,6 +67,195 @@ def test_csv_in_zip():
         
         print("✅ CSV in ZIP test passed!")
 
+def test_csv_in_zip_several_files():
+    """Test the column value lookup in a zip whose first CSV lacks the column."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        zipf.writestr("readme/notes.csv", "note\nignore me\n")
+        zipf.writestr("data/extract.csv", "id,answer\n1,found it\n")
+
+    answers = []
+    for question in [
+        "Download and unzip file q.zip which has extract.csv inside. What is the value in the \"answer\" column of the CSV file?",
+        "Download and unzip file q.zip. What is the value in the \"answer\" column of the CSV file?",
+    ]:
+        response = requests.post(
+            API_URL,
+            data={"question": question},
+            files={"file": ("q.zip", buffer.getvalue(), "application/zip")}
+        )
+
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        assert response.status_code == 200
+        answers.append(response.json()["answer"])
+
+    # Verify the answers: the named file, then the first file with the column
+    assert answers == ["found it", "found it"]
+
+    print("✅ CSV in ZIP with several files test passed!")
+
+def test_csv_in_zip_different_files():
+    """Test that the same question about different uploads gets each file's own answer."""
+    question = "Download and unzip file q.zip which has a single extract.csv file inside. What is the value in the \"answer\" column of the CSV file?"
+    answers = []
+    for value in ["AAA", "BBB", "AAA"]:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zipf:
+            zipf.writestr("extract.csv", f"answer\n{value}\n")
+
+        response = requests.post(
+            API_URL,
+            data={"question": question},
+            files={"file": ("q.zip", buffer.getvalue(), "application/zip")}
+        )
+
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        assert response.status_code == 200
+        answers.append(response.json()["answer"])
+
+    # Verify the answers: one per file, the repeat served from the cache
+    assert answers == ["AAA", "BBB", "AAA"]
+
+    print("✅ Different files test passed!")
+
+def test_csv_query_parsing():
+    """Test that aggregate CSV questions are parsed into the right query."""
+    from csv_query import parse_query
+
+    query = parse_query('What is the sum of the "amount" column where "region" is "North"?')
+    assert (query.op, query.column, query.conditions, query.group_by) == ("sum", "amount", [("region", "==", "North")], None)
+
+    query = parse_query('How many rows have "score" greater than 50?')
+    assert (query.op, query.column, query.conditions) == ("count", None, [("score", ">", 50.0)])
+
+    query = parse_query('What is the average "price" for each "category"?')
+    assert (query.op, query.column, query.group_by) == ("mean", "price", "category")
+
+    assert parse_query('How many unique "city" values are there?').op == "nunique"
+    assert parse_query("What is the capital of France?") is None
+
+    print("✅ CSV query parsing test passed!")
+
+def test_csv_query_aggregates():
+    """Test CSV aggregates with filters and grouping, with pandas and with the csv module."""
+    import csv
+    from csv_query import MissingColumnError, _aggregate_rows, format_result, parse_query, query_partials
+
+    data = "region,amount,score,category,price\nNorth,10,60,a,1.5\nSouth,5,40,b,2\nNorth,2.5,55,a,3.5\nNorth,,70,b,4\n"
+    expected = {
+        'What is the sum of the "amount" column where "region" is "North"?': "12.5",
+        'How many rows have "score" greater than 50?': "3",
+        'What is the average "price" for each "category"?': '{"a": "2.5", "b": "3"}',
+        'What is the maximum "amount" where "score" >= 55?': "10",
+        'How many unique "region" values are there?': "2",
+        'How many rows have "amount" != 10?': "2",
+    }
+    for question, answer in expected.items():
+        query = parse_query(question)
+        assert format_result(query, query_partials(io.StringIO(data), query)) == answer
+
+        # The fallback used when pandas is not installed
+        stream = io.StringIO(data)
+        header = next(csv.reader([stream.readline()]))
+        assert format_result(query, _aggregate_rows(csv.DictReader(stream, fieldnames=header), query)) == answer
+
+    # Tab-separated data is detected from the header
+    query = parse_query('What is the total "amount"?')
+    assert format_result(query, query_partials(io.StringIO("amount\tx\n1\ta\n2\tb\n"), query)) == "3"
+
+    try:
+        query_partials(io.StringIO(data), parse_query('What is the sum of the "cost" column?'))
+        assert False, "expected MissingColumnError"
+    except MissingColumnError as e:
+        assert e.column == "cost"
+
+    print("✅ CSV query aggregates test passed!")
+
+def test_csv_query_zip_members():
+    """Test an aggregate over several data files in one zip, combined."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        zipf.writestr("data1.csv", "region,amount\nNorth,10\nSouth,5\n")
+        zipf.writestr("data2.tsv", "region\tamount\nNorth\t2.5\n")
+        zipf.writestr("data3.json", json.dumps([{"region": "North", "amount": 1}, {"region": "West", "amount": 7}]))
+        zipf.writestr("café.csv", "region,amount\nNorth,100\n".encode("cp1252"))
+        zipf.writestr("notes.csv", "other\n1\n")
+
+    answers = []
+    for question in [
+        'Download q.zip. What is the sum of the "amount" column where "region" is "North"?',
+        'Download q.zip. What is the sum of the "amount" column in data1.csv and data3.json where "region" is "North"?',
+    ]:
+        response = requests.post(
+            API_URL,
+            data={"question": question},
+            files={"file": ("q.zip", buffer.getvalue(), "application/zip")}
+        )
+
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        assert response.status_code == 200
+        answers.append(response.json()["answer"])
+
+    # Verify the answers: every file with the columns, then only the named ones
+    assert answers == ["113.5", "11"]
+
+    print("✅ CSV query zip test passed!")
+
+def test_known_question_with_file():
+    """Test that a stored answer is still found when a file no handler reads is attached."""
+    question = "Install and run Visual Studio Code. In your Terminal (or Command Prompt), type code -s and press Enter. Copy and paste the entire output below. What is the output ofcode -s?"
+
+    response = requests.post(
+        API_URL,
+        data={"question": question},
+        files={"file": ("notes.txt", b"unrelated", "text/plain")}
+    )
+
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.json()}")
+
+    # Verify the response
+    assert response.status_code == 200
+    assert "Version:" in response.json()["answer"]
+
+    print("✅ Known question with file test passed!")
+
+def test_stream_file_content():
+    """Test streaming an upload back as text and as NDJSON, and rejecting one that is not UTF-8."""
+    question = "What is the content of this file?"
+    content = "first line\nsecond line, with ünïcode\n"
+
+    for mode in ["text", "ndjson"]:
+        response = requests.post(
+            API_URL,
+            data={"question": question, "stream": mode},
+            files={"file": ("notes.txt", content.encode("utf-8"), "text/plain")}
+        )
+        print(f"Status Code ({mode}): {response.status_code}")
+
+        # Verify the streamed text
+        assert response.status_code == 200
+        if mode == "text":
+            assert response.text == content
+        else:
+            lines = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+            assert "".join(line["chunk"] for line in lines) == content
+
+        # A file that is not UTF-8 fails before the response starts
+        response = requests.post(
+            API_URL,
+            data={"question": question, "stream": mode},
+            files={"file": ("notes.txt", b"\xff\xfe\x00bad bytes", "text/plain")}
+        )
+        print(f"Response ({mode}, not UTF-8): {response.status_code} {response.text}")
+        assert response.status_code == 500
+        assert "Error reading file" in response.json()["detail"]
+
+    print("✅ Stream file content test passed!")
+
 def test_python_code_execution():
     """Test a question that requires executing Python code."""
     question = """What is the output of the following Python code?
@@ -121,14 +314,417 @@ def test_feedback():
     
     print("✅ Feedback test passed!")
 
+def test_batch():
+    """Test answering several questions in one batch request."""
+    questions = [
+        "What is the capital of France?",
+        {"question": """What is the output of the following Python code?
+```python
+print(6 * 7)
+```"""},
+    ]
+
+    response = requests.post(
+        API_URL + "batch",
+        json=questions
+    )
+
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.text}")
+
+    # Verify the response: one NDJSON line per question, in order
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["index"] for result in results] == [0, 1]
+    assert results[1]["answer"] == "42"
+
+    print("✅ Batch test passed!")
+
+def test_batch_shared_upload():
+    """Test batch questions that all read the same uploaded file at once."""
+    data = "region,amount\n" + "".join(f"{'North' if i % 3 else 'South'},{i}\n" for i in range(20000))
+    regions = ["North", "South", "North", "South", "North", "South", "North"]
+    questions = [
+        {"question": f'What is the sum of the "amount" column of data.csv where "region" is "{region}"?', "file": "data.csv"}
+        for region in regions
+    ]
+
+    response = requests.post(
+        API_URL + "batch",
+        data={"questions": json.dumps(questions)},
+        files={"data.csv": ("data.csv", data.encode(), "text/csv")}
+    )
+
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.text}")
+
+    # Verify the answers: each item reads the whole file from the start
+    assert response.status_code == 200
+    sums = {"North": sum(i for i in range(20000) if i % 3), "South": sum(i for i in range(20000) if not i % 3)}
+    answers = [json.loads(line)["answer"] for line in response.text.splitlines()]
+    assert answers == [str(sums[region]) for region in regions]
+
+    print("✅ Batch shared upload test passed!")
+
+def test_client_timeout():
+    """Test that the client retries a server that never replies, then raises ClientError."""
+    import socket
+    from client import BuddhimattaClient, ClientError
+
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen(8)
+        port = server.getsockname()[1]
+
+        with BuddhimattaClient(f"http://127.0.0.1:{port}/api", timeout=0.2, retries=1, backoff=0.01) as client:
+            try:
+                client.ask("What is the capital of France?")
+                assert False, "expected ClientError"
+            except ClientError as e:
+                print(f"Error: {e}")
+
+    print("✅ Client timeout test passed!")
+
+def test_metrics():
+    """Test that the metrics endpoint reports request and stage timings."""
+    response = requests.get(API_URL.replace("/api/", "/metrics"))
+
+    print(f"Status Code: {response.status_code}")
+
+    # Verify the response
+    assert response.status_code == 200
+    assert "buddhimatta_request_seconds_bucket" in response.text
+    assert 'stage="model_lookup"' in response.text
+
+    print("✅ Metrics test passed!")
+
+def test_model_log():
+    """Test the model's append-only log: idle fsync, replay, torn-tail recovery and compaction."""
+    import time
+    from train_model import BuddhimattaModel
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = os.path.join(temp_dir, "model_data.json")
+        with open(data_file, "w") as f:
+            json.dump({"What is the capital of France?": "Paris"}, f)
+
+        model = BuddhimattaModel(data_file, fsync_every=100, fsync_interval=0.2, compact_threshold=5)
+        model.add_qa_pair("What is the capital of Italy?", "Rome")
+        time.sleep(0.6)
+        # Synced by the flusher once writes stop, not only by the next write
+        assert model._unsynced == 0
+        model.close()
+
+        # A crash mid-append leaves a torn last line
+        with open(data_file + ".log", "a") as f:
+            f.write('{"q": "What is the capital of Spain?", "a": "Mad')
+        model = BuddhimattaModel(data_file, compact_threshold=5)
+        assert model.get_answer("What is the capital of Italy?") == "Rome"
+        assert model.get_answer("What is the capital of Spain?") is None
+        with open(data_file + ".log") as f:
+            assert f.read().endswith("}\n")
+
+        # Enough logged pairs fold the log into a new snapshot
+        for i in range(5):
+            model.add_qa_pair(f"What is {i} squared?", str(i * i))
+        model.close()
+        assert not os.path.exists(data_file + ".log")
+        with open(data_file) as f:
+            saved = json.load(f)
+        assert saved["What is the capital of Italy?"] == "Rome" and saved["What is 4 squared?"] == "16"
+
+    print("✅ Model log test passed!")
+
+def test_fuzzy_match_parameters():
+    """Test that fuzzy matching never mixes up questions that differ in numbers, code or literals."""
+    from question_index import QuestionIndex
+
+    index = QuestionIndex()
+    for question in [
+        "How many Wednesdays are there in the date range 1981-03-01 to 2011-06-14?",
+        "What is 2+2?",
+        'What is the output of print("hello")?',
+        'What is the sum of the "answer" column?',
+        "What is the capital of France?",
+    ]:
+        index.add(question)
+
+    # Verify the matches: rewordings match, changed parameters don't
+    assert index.match("how many wednesdays are there in the date range 1981-03-01 to 2011-06-14", 0.85)
+    assert index.match("What is the capital of France, please?", 0.7)
+    assert index.match("How many Wednesdays are there in the date range 1990-03-01 to 2011-06-14?", 0.5) is None
+    assert index.match("What is 2+2+2?", 0.5) is None
+    assert index.match('What is the output of print("HELLO")?', 0.5) is None
+    assert index.match('What is the sum of the "Answer" column?', 0.5) is None
+
+    print("✅ Fuzzy match test passed!")
+
+def test_body_size_limit():
+    """Test that request bodies over the limit get 413, whether or not they declare a length."""
+    from fastapi import FastAPI, Form
+    from fastapi.testclient import TestClient
+    from body_limit import BodySizeLimitMiddleware
+
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=1000)
+
+    @app.post("/echo")
+    async def echo(question: str = Form(...)):
+        return {"length": len(question)}
+
+    client = TestClient(app)
+
+    def chunked(size):
+        body = ("question=" + "x" * size).encode()
+        for start in range(0, len(body), 100):
+            yield body[start:start + 100]
+
+    # Verify the responses: small bodies pass, large ones are stopped
+    assert client.post("/echo", data={"question": "x" * 500}).json() == {"length": 500}
+    assert client.post("/echo", data={"question": "x" * 2000}).status_code == 413
+    response = client.post("/echo", content=chunked(2000), headers={"content-type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 413
+    response = client.post("/echo", content=chunked(500), headers={"content-type": "application/x-www-form-urlencoded"})
+    assert response.json() == {"length": 500}
+
+    print("✅ Body size limit test passed!")
+
+def test_similar_template_dispatch():
+    """Test that a question close to a solved one goes to the handler that solved it first."""
+    import asyncio
+    from handlers import HandlerRegistry
+
+    registry = HandlerRegistry()
+
+    @registry.handler(r"value in the (\w+) column", triggers=["value"])
+    async def first(question, file, match):
+        return None if question.startswith("Sheet 2") else "first"
+
+    @registry.handler(r"value in the (\w+) column", triggers=["column"])
+    async def second(question, file, match):
+        return "second"
+
+    async def ask(question):
+        return await registry.dispatch(question, None)
+
+    # Verify the dispatch: the nearest solved template's handler is tried first
+    assert asyncio.run(ask("Sheet 2: What is the value in the answer column of the sheet?")) == "second"
+    assert asyncio.run(ask("What is the value in the score column of the sheet?")) == "second"
+    assert asyncio.run(ask("Which value in the x column would you pick for a report today, and why?")) == "first"
+
+    print("✅ Similar template dispatch test passed!")
+
+def test_template_parameters():
+    """Test that question templates keep every distinct parameter apart."""
+    from templates import extract_template
+
+    def params(question):
+        return extract_template(question).params
+
+    # Verify the parameters: only leading zeros are ignored
+    assert params("What is 12345678901234567890 mod 7?") != params("What is 12345678901234567891 mod 7?")
+    assert params("Use version 1.10 of the tool") != params("Use version 1.1 of the tool")
+    assert params("Sum the first 05 rows") == params("Sum the first 5 rows")
+    assert extract_template("Sum the first 5 rows").id == extract_template("Sum the first 9 rows").id
+
+    print("✅ Template parameters test passed!")
+
+def test_bulk_training():
+    """Test bulk training from JSONL and CSV files: counts, deduplication and the saved snapshot."""
+    from bulk_train import SourceReader
+    from train_model import BuddhimattaModel
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = os.path.join(temp_dir, "model_data.json")
+        with open(data_file, "w") as f:
+            json.dump({"What is the capital of France?": "Paris"}, f)
+        jsonl_path = os.path.join(temp_dir, "pairs.jsonl")
+        with open(jsonl_path, "w") as f:
+            f.write(json.dumps({"question": "What is 2+2?", "answer": "4"}) + "\n")
+            f.write(json.dumps({"q": "  what is the CAPITAL of france? ", "a": "Paris, France"}) + "\n")
+            f.write(json.dumps({"question": "", "answer": "nothing asked"}) + "\n")
+            f.write("not json\n")
+        csv_path = os.path.join(temp_dir, "pairs.csv")
+        pd.DataFrame({
+            "question": ["What is 3+3?", "What is 2+2?", "What is 5+5?"],
+            "answer": ["6", "four", None],
+        }).to_csv(csv_path, index=False)
+
+        model = BuddhimattaModel(data_file)
+        stats = model.train_bulk(SourceReader([jsonl_path, csv_path]))
+        model.close()
+
+        # Verify the counts: repeats update, even when spelled differently
+        assert stats == {"read": 6, "skipped": 2, "added": 2, "updated": 2}
+
+        # Verify the snapshot reloads with the deduplicated pairs
+        model = BuddhimattaModel(data_file)
+        assert len(model.qa_pairs) == 3
+        assert model.qa_pairs["What is the capital of France?"] == "Paris, France"
+        assert model.get_answer("What is 2+2?") == "four"
+        assert model.get_answer("What is 3+3?") == "6"
+        model.close()
+
+    print("✅ Bulk training test passed!")
+
+def test_shared_store():
+    """Test that models sharing a SQLite store see each other's pairs and updates."""
+    from train_model import BuddhimattaModel
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shared_db = os.path.join(temp_dir, "shared.db")
+        first = BuddhimattaModel(os.path.join(temp_dir, "a.json"), shared_db=shared_db)
+        second = BuddhimattaModel(os.path.join(temp_dir, "b.json"), shared_db=shared_db)
+        # Build the second model's indexes before the write, as a running worker would have
+        assert second.get_answer("What is the capital of Italy?") is None
+
+        first.add_qa_pair("What is the capital of Italy?", "Rome")
+
+        # Verify the lookups in the other model: exact, normalized and fuzzy
+        assert second.get_answer("What is the capital of Italy?") == "Rome"
+        assert second.get_answer("  what is the CAPITAL of italy ") == "Rome"
+        assert second.get_answer("What is capital of Italy?") == "Rome"
+
+        first.add_qa_pair("What is the capital of Italy?", "Roma")
+        assert second.get_answer("What is the capital of Italy?") == "Roma"
+        assert second.get_answer("What is capital of Italy?") == "Roma"
+
+    print("✅ Shared store test passed!")
+
+def test_snapshot_follows_json():
+    """Test that a binary snapshot is used only while the JSON it was built from is unchanged."""
+    from snapshot import write_snapshot
+    from train_model import BuddhimattaModel
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = os.path.join(temp_dir, "model_data.json")
+        snapshot_file = os.path.join(temp_dir, "model_data.bin")
+        with open(data_file, "w") as f:
+            json.dump({"What is the capital of France?": "Paris"}, f)
+        write_snapshot({"What is the capital of France?": "Paris"}, snapshot_file, source=data_file)
+
+        model = BuddhimattaModel(data_file)
+        assert model.get_answer("What is the capital of france?") == "Paris"
+        assert type(model.qa_pairs).__name__ == "SnapshotPairs"
+        model.close()
+
+        # A pair added to the JSON, with both files given the same mtime as a fresh clone would
+        with open(data_file, "w") as f:
+            json.dump({"What is the capital of France?": "Paris", "What is the capital of Italy?": "Rome"}, f)
+        os.utime(snapshot_file, (0, 0))
+        os.utime(data_file, (0, 0))
+
+        # Verify the stale snapshot is ignored in favour of the JSON
+        model = BuddhimattaModel(data_file)
+        assert model.get_answer("What is the capital of Italy?") == "Rome"
+        model.close()
+
+    print("✅ Snapshot test passed!")
+
+def test_compact_store():
+    """Test that the compact store deduplicates, compresses and reclaims answers."""
+    from compact_store import CompactPairs
+
+    long_answer = "Version: Code 1.96.3\n" * 100
+    pairs = CompactPairs({f"Question {i}?": long_answer for i in range(50)}, compression="zlib")
+    pairs["Other?"] = "short"
+
+    # Verify the store: one copy of the shared answer, compressed
+    assert len(pairs) == 51 and pairs["Question 7?"] == long_answer and pairs["Other?"] == "short"
+    stats = pairs.stats()
+    assert stats["distinct_answers"] == 2 and stats["compressed_answers"] == 1
+    assert stats["arena_bytes"] < len(long_answer)
+
+    # Replaced answers leave unused bytes until compacted
+    for i in range(50):
+        pairs[f"Question {i}?"] = f"answer {i}"
+    assert pairs.stats()["unused_bytes"] > 0
+    pairs.compact()
+    assert pairs.stats()["unused_bytes"] == 0
+    assert pairs["Question 49?"] == "answer 49" and dict(pairs)["Other?"] == "short"
+
+    print("✅ Compact store test passed!")
+
+def test_snippet_cpu_limit_repeated():
+    """Test that a snippet worker keeps running jobs after its total CPU time passes the limit."""
+    from sandbox import SnippetPool
+
+    pool = SnippetPool(workers=1, timeout=10, cpu_time=1, output_cache_entries=0)
+    code = "import time\nstart = time.process_time()\nwhile time.process_time() - start < 0.6: pass\nprint('done')"
+    try:
+        outputs = [pool.run_sync(code).strip() for _ in range(3)]
+    finally:
+        pool.close()
+
+    # Verify the jobs: each stays within its own budget, so all succeed
+    assert outputs == ["done", "done", "done"]
+
+    print("✅ Snippet CPU limit test passed!")
+
+def test_snippet_determinism():
+    """Test which snippets are treated as deterministic, and so have their output cached."""
+    from sandbox import is_deterministic
+
+    assert is_deterministic("import math\nprint(sorted([3, 1, 2]), math.pi)")
+    assert is_deterministic("a = {'x': 1}\nprint(list(a.items()), 10 * 3)")
+    for code in [
+        "import time\nprint(time.time())",
+        'print(getattr(__builtins__, "__import__")("time").time())',
+        'print(__builtins__.open("/etc/hostname").read())',
+        'name = "__import__"',
+        "print({'a', 'b'})",
+        "a = {'x': 1, 'y': 2}\nb = {'z': 3}\nprint(a.keys() | b.keys())",
+        "a = {'x': 1}\nviews = a.items()\nviews ^= {('y', 2): 0}.items()\nprint(views)",
+    ]:
+        assert not is_deterministic(code), code
+
+    print("✅ Snippet determinism test passed!")
+
+def test_cold_import_budget():
+    """Test that importing the app is fast and leaves the model for later."""
+    from startup_profile import cold_import
+
+    elapsed, model_loaded, _ = cold_import("main")
+
+    print(f"Cold import: {elapsed:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+
+    # Verify the import: within budget, model not loaded yet
+    assert not model_loaded
+    assert elapsed < IMPORT_BUDGET_MS
+
+    print("✅ Cold import test passed!")
+
 if __name__ == "__main__":
     print("Running API tests...")
     
     try:
         test_known_question()
         test_csv_in_zip()
+        test_csv_in_zip_several_files()
+        test_csv_in_zip_different_files()
+        test_known_question_with_file()
+        test_csv_query_parsing()
+        test_csv_query_aggregates()
+        test_csv_query_zip_members()
+        test_stream_file_content()
         test_python_code_execution()
         test_feedback()
+        test_batch()
+        test_batch_shared_upload()
+        test_client_timeout()
+        test_metrics()
+        test_model_log()
+        test_fuzzy_match_parameters()
+        test_body_size_limit()
+        test_similar_template_dispatch()
+        test_template_parameters()
+        test_bulk_training()
+        test_shared_store()
+        test_snapshot_follows_json()
+        test_compact_store()
+        test_snippet_cpu_limit_repeated()
+        test_snippet_determinism()
+        test_cold_import_budget()
         
         print("\n🎉 All tests passed! Your API is working correctly.")
     except Exception as e:
@@ -1,54 +1,423 @@
+import atexit
 import json
 import os
+import queue
+import threading
+import time
+
+from compact_store import CompactPairs
+from question_index import QuestionIndex, normalize_question
+from shared_store import SQLitePairs
+from snapshot import QASnapshot, SnapshotPairs, built_from, write_snapshot
+from templates import TemplateStore
 
 class BuddhimattaModel:
     """
     A simple model that stores question-answer pairs and can be expanded over time.
     This is a placeholder for a more sophisticated model that could be trained on more data.
+
+    Pairs are persisted as a JSON snapshot (``data_file``) plus an append-only
+    JSONL log of pairs added since that snapshot. New pairs only append a line
+    to the log; once the log grows past ``compact_threshold`` entries it is
+    folded back into a fresh snapshot.
+
+    If a binary snapshot built by ``snapshot.py`` (``snapshot_file``) was
+    built from the JSON snapshot as it is now (its header records the JSON's
+    size and digest), it is memory-mapped instead of parsing the JSON, and
+    compaction keeps both files up to date.
+
+    The model is safe to share between threads. Lookups take no lock. Writers
+    hold an in-memory lock only long enough to update the dict and index, then
+    queue the pair for a single background flusher thread, which appends
+    everything queued so far with one write, fsyncs in batches and compacts.
+    Request threads never wait on disk I/O.
+
+    With ``shared_db`` set, pairs live in a SQLite database shared by every
+    worker process instead (see ``shared_store.py``). It is seeded from the
+    local snapshot the first time, writes go straight to it, and pairs added
+    by other workers show up in lookups without a restart.
+
+    With ``compact_store`` set ("plain", "zlib" or "zstd"), pairs loaded from
+    JSON are held in a ``CompactPairs`` (see ``compact_store.py``) instead of
+    a dict: answers are deduplicated and packed into one byte arena, and
+    large ones optionally compressed.
     """
     
-    def __init__(self, data_file="model_data.json"):
+    def __init__(self, data_file="model_data.json", log_file=None, snapshot_file=None,
+                 shared_db=None, fsync_every=32, fsync_interval=1.0, compact_threshold=1000,
+                 match_threshold=0.85, compact_store=None):
         self.data_file = data_file
+        self.shared_db = shared_db
+        self.log_file = log_file or data_file + ".log"
+        self.snapshot_file = snapshot_file or os.path.splitext(data_file)[0] + ".bin"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self.match_threshold = match_threshold
+        self.compact_store = compact_store
         self.qa_pairs = {}
+        self._index = None
+        self._templates = None
+        # Guards in-memory writes; the I/O lock guards the log and snapshots
+        self._lock = threading.RLock()
+        self._io_lock = threading.RLock()
+        self._pending = queue.Queue()
+        self._flusher = None
+        self._log = None
+        self._log_entries = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
         self.load_data()
+        atexit.register(self.close)
+    
+    def _snapshot_is_current(self):
+        if not os.path.exists(self.snapshot_file):
+            return False
+        if not os.path.exists(self.data_file):
+            return True
+        return built_from(self.snapshot_file, self.data_file)
     
     def load_data(self):
-        """Load existing question-answer pairs if available."""
+        """Load the snapshot and replay any pairs logged after it."""
+        self._index = None
+        self._templates = None
+        if self.shared_db:
+            store = SQLitePairs(self.shared_db)
+            if len(store) == 0:
+                # First worker up seeds the shared store from the local files
+                self._load_local()
+                store.update_many(self.qa_pairs.items(), replace=False)
+            self.qa_pairs = store
+            print(f"Using {len(store)} question-answer pairs shared through {self.shared_db}")
+            return
+        self._load_local()
+    
+    def _new_pairs(self, pairs=()):
+        if not self.compact_store:
+            return dict(pairs)
+        compression = None if self.compact_store == "plain" else self.compact_store
+        return CompactPairs(pairs, compression=compression)
+
+    def _load_local(self):
+        if self._snapshot_is_current():
+            try:
+                self.qa_pairs = SnapshotPairs(QASnapshot(self.snapshot_file))
+                print(f"Mapped {len(self.qa_pairs)} question-answer pairs from {self.snapshot_file}")
+                self._replay_log()
+                return
+            except Exception as e:
+                print(f"Error mapping snapshot, falling back to {self.data_file}: {e}")
         if os.path.exists(self.data_file):
             try:
                 with open(self.data_file, 'r') as f:
-                    self.qa_pairs = json.load(f)
+                    self.qa_pairs = json.load(f, object_pairs_hook=self._new_pairs)
                 print(f"Loaded {len(self.qa_pairs)} question-answer pairs from {self.data_file}")
             except Exception as e:
                 print(f"Error loading data: {e}")
-                self.qa_pairs = {}
+                self.qa_pairs = self._new_pairs()
+            self._replay_log()
         else:
             # Initialize with default data
-            self.qa_pairs = {
+            self.qa_pairs = self._new_pairs({
                 "Install and run Visual Studio Code. In your Terminal (or Command Prompt), type code -s and press Enter. Copy and paste the entire output below. What is the output ofcode -s?": 
                 "Version:          Code 1.96.3 (91fbdddc47bc9c09064bf7acf133d22631cbf083, 2025-01-09T18:14:09.060Z)\nOS Version:       Windows_NT x64 10.0.26120\nCPUs:             11th Gen Intel(R) Core(TM) i5-11260H @ 2.60GHz (12 x 2611)\n"
-            }
+            })
             self.save_data()
     
-    def save_data(self):
-        """Save the current question-answer pairs to the data file."""
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.qa_pairs, f, indent=2)
-            print(f"Saved {len(self.qa_pairs)} question-answer pairs to {self.data_file}")
-        except Exception as e:
-            print(f"Error saving data: {e}")
+    @property
+    def index(self):
+        """Fuzzy question index, built on first use rather than at startup."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    if isinstance(self.qa_pairs, SQLitePairs):
+                        # Everything up to now is indexed below; later polls
+                        # only need to pick up what arrives after this
+                        self._sync_shared()
+                    index = QuestionIndex()
+                    for question in self.qa_pairs:
+                        index.add(question)
+                    self._index = index
+        return self._index
+
+    @property
+    def templates(self):
+        """Stored questions keyed by template and parameters, built on first use."""
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    if isinstance(self.qa_pairs, SQLitePairs):
+                        self._sync_shared()
+                    templates = TemplateStore()
+                    for question in self.qa_pairs:
+                        templates.add(question, question)
+                    self._templates = templates
+        return self._templates
+
+    def _sync_shared(self):
+        """Add pairs that other workers have written since the last poll to the built indexes."""
+        new_questions = self.qa_pairs.poll_new_questions()
+        if new_questions:
+            with self._lock:
+                for new_question in new_questions:
+                    if self._index is not None:
+                        self._index.add(new_question)
+                    if self._templates is not None:
+                        self._templates.add(new_question, new_question)
+    
+    def _replay_log(self):
+        """Apply the pairs recorded in the log on top of the loaded snapshot."""
+        self._log_entries = 0
+        if not os.path.exists(self.log_file):
+            return
+        good_offset = 0
+        with open(self.log_file, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; everything
+                    # before it is intact.
+                    break
+                self.qa_pairs[entry["q"]] = entry["a"]
+                self._log_entries += 1
+                good_offset += len(line)
+        if good_offset < os.path.getsize(self.log_file):
+            # Drop the torn tail so new appends start on a clean line
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(good_offset)
+        if self._log_entries:
+            print(f"Replayed {self._log_entries} logged pairs from {self.log_file}")
+    
+    def save_data(self, indent=2):
+        """
+        Write a full snapshot of the question-answer pairs and reset the log.
+
+        ``indent=None`` writes compact JSON, much faster for a large corpus.
+        """
+        with self._io_lock:
+            try:
+                # Copy under the write lock so the dump never races a writer
+                with self._lock:
+                    pairs = dict(self.qa_pairs)
+                tmp_file = self.data_file + ".tmp"
+                with open(tmp_file, 'w') as f:
+                    json.dump(pairs, f, indent=indent)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Atomic swap so readers never see a half-written snapshot
+                os.replace(tmp_file, self.data_file)
+                if isinstance(self.qa_pairs, SnapshotPairs):
+                    # Fingerprints the JSON just written, so the two stay paired
+                    write_snapshot(pairs, self.snapshot_file, source=self.data_file)
+                    fresh = SnapshotPairs(QASnapshot(self.snapshot_file))
+                    with self._lock:
+                        # Carry over pairs added while the snapshot was written.
+                        # The old map is left for the GC so in-flight readers
+                        # never see it closed.
+                        for question, answer in self.qa_pairs.overlay.items():
+                            if pairs.get(question) != answer:
+                                fresh[question] = answer
+                        self.qa_pairs = fresh
+                # Pairs still queued are re-logged by the flusher afterwards,
+                # so nothing logged so far is missing from the snapshot
+                self._truncate_log()
+                print(f"Saved {len(pairs)} question-answer pairs to {self.data_file}")
+            except Exception as e:
+                print(f"Error saving data: {e}")
+    
+    def _truncate_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        self._log_entries = 0
+        self._unsynced = 0
+    
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="buddhimatta-flusher", daemon=True)
+                self._flusher.start()
+    
+    def _flush_loop(self):
+        """Drain queued pairs into the log, coalescing bursts into one write."""
+        while True:
+            try:
+                batch = [self._pending.get(timeout=self.fsync_interval or None)]
+            except queue.Empty:
+                # Quiet for a whole interval: sync what the last batch left
+                try:
+                    self._sync_log()
+                except Exception as e:
+                    print(f"Error saving data: {e}")
+                continue
+            while len(batch) < 1024:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._append_log(batch)
+            except Exception as e:
+                print(f"Error saving data: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+    
+    def _append_log(self, batch):
+        """Append pairs to the log, fsyncing in batches, and compact if due."""
+        with self._io_lock:
+            if self._log is None:
+                self._log = open(self.log_file, 'a', encoding='utf-8')
+            self._log.write("".join(json.dumps({"q": q, "a": a}) + "\n" for q, a in batch))
+            self._log.flush()
+            self._log_entries += len(batch)
+            self._unsynced += len(batch)
+            now = time.monotonic()
+            if self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                os.fsync(self._log.fileno())
+                self._unsynced = 0
+                self._last_sync = now
+            if self._log_entries >= self.compact_threshold:
+                self.save_data()
+    
+    def flush(self):
+        """Block until every added pair is in the log and fsynced onto disk."""
+        self._pending.join()
+        self._sync_log()
+
+    def _sync_log(self):
+        with self._io_lock:
+            if self._log is not None and self._unsynced:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+    
+    def close(self):
+        """Flush and close the log file."""
+        self.flush()
+        with self._io_lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
     
     def add_qa_pair(self, question, answer):
         """Add a new question-answer pair to the model."""
-        self.qa_pairs[question] = answer
-        self.save_data()
+        with self._lock:
+            self.qa_pairs[question] = answer
+            if self._index is not None:
+                self._index.add(question)
+            if self._templates is not None:
+                self._templates.add(question, question)
+        if isinstance(self.qa_pairs, SQLitePairs):
+            # Counting the shared table's rows would scan all of them
+            print("Added new question-answer pair to the shared store.")
+            return
+        # Persisted by the background flusher
+        self._pending.put((question, answer))
+        if self._flusher is None:
+            self._start_flusher()
         print(f"Added new question-answer pair. Total pairs: {len(self.qa_pairs)}")
     
+    def lookup(self, question, threshold=None):
+        """
+        Find the best stored answer for a question.
+
+        Returns ``(answer, score)``: an exact or normalized match scores 1.0,
+        a fuzzy match scores its similarity, and a miss is ``(None, 0.0)``.
+        """
+        answer = self.qa_pairs.get(question)
+        if answer is not None:
+            return answer, 1.0
+        if isinstance(self.qa_pairs, (SnapshotPairs, SQLitePairs)):
+            answer = self.qa_pairs.find_normalized(question)
+            if answer is not None:
+                return answer, 1.0
+        if isinstance(self.qa_pairs, SQLitePairs) and (self._index is not None or self._templates is not None):
+            # Index pairs that other workers have added since the last lookup
+            self._sync_shared()
+        # Same template and parameters, up to leading zeros in numbers
+        stored = self.templates.get(question)
+        if stored is not None:
+            answer = self.qa_pairs.get(stored)
+            if answer is not None:
+                return answer, 1.0
+        if threshold is None:
+            threshold = self.match_threshold
+        match = self.index.match(question, threshold)
+        if match is None:
+            return None, 0.0
+        matched_question, score = match
+        return self.qa_pairs.get(matched_question), score
+    
     def get_answer(self, question):
         """Get the answer for a given question if it exists."""
-        return self.qa_pairs.get(question, None)
+        return self.lookup(question)[0]
     
+    def train_bulk(self, pairs, batch_size=10000, progress=None):
+        """
+        Load a large stream of ``(question, answer)`` pairs in one go.
+
+        Questions and answers are stripped, empty ones skipped, and questions
+        deduplicated by their normalized form, including against pairs
+        already stored, so a repeat updates the stored question rather than
+        adding a near-copy. Pairs are applied ``batch_size`` at a time without
+        going through the log, the match indexes are dropped to be rebuilt
+        lazily by the next lookup, and a single compact snapshot is written. ``progress`` is called
+        with the running counts after every batch.
+
+        Returns the counts: rows ``read``, ``skipped``, ``added`` and ``updated``.
+        """
+        self.flush()
+        shared = isinstance(self.qa_pairs, SQLitePairs)
+        known = {normalize_question(question): question for question in self.qa_pairs}
+        stats = {"read": 0, "skipped": 0, "added": 0, "updated": 0}
+
+        def apply(batch):
+            if shared:
+                self.qa_pairs.update_many(batch.items())
+            else:
+                with self._lock:
+                    for question, answer in batch.items():
+                        self.qa_pairs[question] = answer
+            if progress is not None:
+                progress(stats)
+
+        batch = {}
+        for question, answer in pairs:
+            stats["read"] += 1
+            question = str(question or "").strip()
+            answer = str(answer if answer is not None else "").strip()
+            if not question or not answer:
+                stats["skipped"] += 1
+                continue
+            key = normalize_question(question)
+            stored = known.get(key)
+            if stored is None:
+                known[key] = question
+                stats["added"] += 1
+            else:
+                question = stored
+                stats["updated"] += 1
+            batch[question] = answer
+            if len(batch) >= batch_size:
+                apply(batch)
+                batch = {}
+        if batch:
+            apply(batch)
+        del known
+
+        with self._lock:
+            # Rebuilt in one pass on the next lookup, if there is one
+            self._index = None
+            self._templates = None
+        if not shared:
+            self.save_data(indent=None)
+        return stats
+
     def train(self, new_qa_pairs):
         """Train the model with new question-answer pairs."""
         for question, answer in new_qa_pairs.items():